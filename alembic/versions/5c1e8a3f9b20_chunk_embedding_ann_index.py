@@ -0,0 +1,37 @@
+"""chunk embedding ann index
+
+Revision ID: 5c1e8a3f9b20
+Revises: 27b0cd977a36
+Create Date: 2026-01-12 10:24:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8a3f9b20'
+down_revision: Union[str, None] = '27b0cd977a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # HNSW needs no training data, so it is safe to build on an empty or populated table.
+    # Switch to IVFFlat after bulk loads with app.db.vector_utils.build_vector_index (build_vector_index.py).
+    op.create_index(
+        'ix_chunks_embedding_hnsw',
+        'chunks',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_chunks_embedding_ivfflat")
+    op.drop_index('ix_chunks_embedding_hnsw', table_name='chunks')
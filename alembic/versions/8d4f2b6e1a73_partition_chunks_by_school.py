@@ -0,0 +1,140 @@
+"""partition chunks by school
+
+Revision ID: 8d4f2b6e1a73
+Revises: 5c1e8a3f9b20
+Create Date: 2026-01-19 14:02:09.553871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f2b6e1a73'
+down_revision: Union[str, None] = '5c1e8a3f9b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ENSURE_PARTITION_FN = """
+CREATE OR REPLACE FUNCTION ensure_chunk_partition(p_school text) RETURNS void AS $$
+DECLARE
+    part_name text := 'chunks_' || substr(md5(p_school), 1, 12);
+BEGIN
+    IF to_regclass(part_name) IS NULL THEN
+        BEGIN
+            EXECUTE format('CREATE TABLE %I PARTITION OF chunks FOR VALUES IN (%L)', part_name, p_school);
+        EXCEPTION WHEN duplicate_table THEN
+            NULL;
+        END;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+SYNC_TENANT_KEYS_FN = """
+CREATE OR REPLACE FUNCTION sync_chunk_tenant_keys() RETURNS trigger AS $$
+BEGIN
+    PERFORM ensure_chunk_partition(NEW.school_name);
+    UPDATE chunks
+       SET school_name = NEW.school_name,
+           syllabus = NEW.syllabus,
+           class_name = NEW.class_name,
+           subject = NEW.subject
+     WHERE document_id = NEW.id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE chunks RENAME TO chunks_old")
+    op.execute("ALTER TABLE chunks_old RENAME CONSTRAINT pk_chunks TO pk_chunks_old")
+    op.execute("DROP INDEX IF EXISTS ix_chunks_embedding_hnsw")
+    op.execute("DROP INDEX IF EXISTS ix_chunks_embedding_ivfflat")
+
+    op.create_table('chunks',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('document_id', sa.UUID(), nullable=True),
+    sa.Column('school_name', sa.String(), nullable=False),
+    sa.Column('syllabus', sa.String(), nullable=False),
+    sa.Column('class_name', sa.String(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('embedding', pgvector.sqlalchemy.vector.VECTOR(dim=768), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'school_name'),
+    postgresql_partition_by='LIST (school_name)'
+    )
+    op.execute("CREATE TABLE chunks_default PARTITION OF chunks DEFAULT")
+    op.execute(ENSURE_PARTITION_FN)
+    op.execute("SELECT ensure_chunk_partition(school_name) FROM (SELECT DISTINCT school_name FROM documents) s")
+
+    op.execute("""
+        INSERT INTO chunks (id, document_id, school_name, syllabus, class_name, subject, chunk_index, text, embedding)
+        SELECT c.id, c.document_id, d.school_name, d.syllabus, d.class_name, d.subject, c.chunk_index, c.text, c.embedding
+          FROM chunks_old c
+          JOIN documents d ON d.id = c.document_id
+    """)
+    op.drop_table('chunks_old')
+
+    # Indexes on the partitioned parent are created on every partition, current and future.
+    op.create_index('ix_chunks_document_id', 'chunks', ['document_id'], unique=False)
+    op.create_index('ix_chunks_tenant', 'chunks', ['syllabus', 'class_name', 'subject'], unique=False)
+    op.create_index(
+        'ix_chunks_embedding_hnsw',
+        'chunks',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+
+    op.execute(SYNC_TENANT_KEYS_FN)
+    op.execute("""
+        CREATE TRIGGER trg_documents_sync_chunk_keys
+        AFTER UPDATE OF school_name, syllabus, class_name, subject ON documents
+        FOR EACH ROW
+        WHEN ((OLD.school_name, OLD.syllabus, OLD.class_name, OLD.subject)
+              IS DISTINCT FROM (NEW.school_name, NEW.syllabus, NEW.class_name, NEW.subject))
+        EXECUTE FUNCTION sync_chunk_tenant_keys()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_documents_sync_chunk_keys ON documents")
+    op.execute("DROP FUNCTION IF EXISTS sync_chunk_tenant_keys()")
+
+    op.execute("ALTER TABLE chunks RENAME TO chunks_partitioned")
+    op.create_table('chunks',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('document_id', sa.UUID(), nullable=True),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('embedding', pgvector.sqlalchemy.vector.VECTOR(dim=768), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE', name='fk_chunks_document_id_documents_unpartitioned'),
+    sa.PrimaryKeyConstraint('id', name='pk_chunks_unpartitioned')
+    )
+    op.execute("""
+        INSERT INTO chunks (id, document_id, chunk_index, text, embedding)
+        SELECT id, document_id, chunk_index, text, embedding FROM chunks_partitioned
+    """)
+    op.execute("DROP TABLE chunks_partitioned CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS ensure_chunk_partition(text)")
+    op.execute("ALTER TABLE chunks RENAME CONSTRAINT pk_chunks_unpartitioned TO pk_chunks")
+    op.execute("ALTER TABLE chunks RENAME CONSTRAINT fk_chunks_document_id_documents_unpartitioned TO fk_chunks_document_id_documents")
+    op.create_index(
+        'ix_chunks_embedding_hnsw',
+        'chunks',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
@@ -0,0 +1,45 @@
+"""answer cache
+
+Revision ID: a93c5e7d2f18
+Revises: f41b7a2c6d58
+Create Date: 2026-02-09 16:05:12.402771
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93c5e7d2f18'
+down_revision: Union[str, None] = 'f41b7a2c6d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('answer_cache',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('school_name', sa.String(), nullable=False),
+    sa.Column('syllabus', sa.String(), nullable=False),
+    sa.Column('class_name', sa.String(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('user_type', sa.String(), nullable=False),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=False),
+    sa.Column('embedding', pgvector.sqlalchemy.vector.VECTOR(dim=768), nullable=False),
+    sa.Column('hit_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_hit_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_answer_cache'))
+    )
+    # Lookups scan the subject's rows exactly (ix_answer_cache_subject): a global ANN index would mostly
+    # return other subjects' rows and make filtered lookups miss.
+    op.create_index('ix_answer_cache_subject', 'answer_cache', ['school_name', 'syllabus', 'class_name', 'subject', 'user_type'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_answer_cache_subject', table_name='answer_cache')
+    op.drop_table('answer_cache')
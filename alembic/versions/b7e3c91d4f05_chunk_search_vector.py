@@ -0,0 +1,31 @@
+"""chunk search vector
+
+Revision ID: b7e3c91d4f05
+Revises: 8d4f2b6e1a73
+Create Date: 2026-01-26 09:41:55.207316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3c91d4f05'
+down_revision: Union[str, None] = '8d4f2b6e1a73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chunks', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    # Backfill existing chunks with app.models.document.FTS_CONFIG (new ones are populated by IngestionService).
+    op.execute("UPDATE chunks SET search_vector = to_tsvector('english', text)")
+    op.create_index('ix_chunks_search_vector', 'chunks', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunks_search_vector', table_name='chunks')
+    op.drop_column('chunks', 'search_vector')
@@ -0,0 +1,31 @@
+"""chunk embedding short
+
+Revision ID: f41b7a2c6d58
+Revises: b7e3c91d4f05
+Create Date: 2026-02-09 16:35:12.907413
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f41b7a2c6d58'
+down_revision: Union[str, None] = 'b7e3c91d4f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chunks', sa.Column('embedding_short', pgvector.sqlalchemy.vector.VECTOR(dim=256), nullable=True))
+    # Matryoshka prefix of the existing 768-d embeddings; new chunks are filled by IngestionService.
+    op.execute("UPDATE chunks SET embedding_short = ((embedding::real[])[1:256])::vector(256) WHERE embedding IS NOT NULL")
+    # The matryoshka first-pass index is built by build_vector_index.py when EMBEDDING_STORAGE=matryoshka
+
+
+def downgrade() -> None:
+    # Indexes on embedding_short go with the column
+    op.drop_column('chunks', 'embedding_short')
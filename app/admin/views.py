@@ -12,6 +12,8 @@ from app.config import settings
 from app.models.document import Document, DocStatus
 from app.models.school import School, Syllabus, Class, Subject
 from app.models.user import User
+from app.services.readiness import readiness_cache
+from app.services.answer_cache import AnswerCacheService
 
 logger = logging.getLogger(__name__)
 
@@ -112,9 +114,33 @@ class DocumentView(SecureModelView):
             except OSError as e:
                 logger.error(f"Error deleting file {model.file_path}: {e}")
                 
+    def after_model_delete(self, model):
+        """Refreshes the subject's readiness, cached answers and NumPy vector index once the chunks are gone."""
+        key = (model.school_name, model.syllabus, model.class_name, model.subject)
+        self._subjects_changed(key)
+        self._queue_index_rebuild(key)
+
+    def _subjects_changed(self, *keys):
+        readiness_cache.refresh_sync(self.session, *keys)
+        AnswerCacheService.invalidate_sync(self.session, *keys)
+
+    def _queue_index_rebuild(self, *keys):
+        if settings.SEARCH_MODE != "numpy":
+            return
+        try:
+            from app.worker.tasks import rebuild_subject_index_task
+            for key in set(keys):
+                rebuild_subject_index_task.delay(*key)
+        except Exception as e:
+            logger.error(f"Failed to queue vector index rebuild: {e}")
+
     def on_model_change(self, form, model, is_created):
         file_data = form.file.data
         model._should_ingest = False
+        model._old_subject_key = None if is_created else (
+            form.school_name.object_data, form.syllabus.object_data,
+            form.class_name.object_data, form.subject.object_data
+        )
         
         if not model.id:
             model.id = uuid.uuid4()
@@ -163,6 +189,13 @@ class DocumentView(SecureModelView):
                 model.status = form.status.object_data
 
     def after_model_change(self, form, model, is_created):
+        old_key = getattr(model, '_old_subject_key', None)
+        new_key = (model.school_name, model.syllabus, model.class_name, model.subject)
+        self._subjects_changed(new_key, *([old_key] if old_key else []))
+
+        if old_key and old_key != new_key:
+            self._queue_index_rebuild(old_key, *([] if model._should_ingest else [new_key]))
+
         if getattr(model, '_should_ingest', False):
             try:
                 from app.worker.tasks import ingest_pdf_task
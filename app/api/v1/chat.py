@@ -1,129 +1,372 @@
+import json
+import time
+import uuid
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional, Callable, Awaitable
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, exists, and_
-from google.adk.sessions import DatabaseSessionService
-from google.adk.runners import Runner
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from sse_starlette.sse import EventSourceResponse
+from opentelemetry import trace
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
 from app.config import settings
-from app.schemas.chat import ChatRequest, ChatResponse, ClearSessionRequest
-from app.services.agent import get_agent 
-from app.models.document import Document
+from app.schemas.chat import (
+    ChatRequest, ChatResponse, ClearSessionRequest, BatchChatRequest, BatchChatItem, BatchChatResponse
+)
+from app.services.agent import AgentRegistry, CHAT_MODES
+from app.services.tools import search_syllabus_context, search_syllabus_batch
+from app.services.readiness import readiness_cache
+from app.services.session_history import WindowedSessionService, needs_compaction, compact_session_history, is_first_turn, CONTEXT_MARKER
+from app.services.single_flight import flight_key, make_single_flight
+from app.services.embedding_cache import normalize_query
+from app.services.answer_cache import AnswerCacheService
+from app.services.llm_factory import LLMFactory
+from app.services.session_store import RedisSessionService
+from app.services.admission import make_admission_controller, AdmissionRejected
 from app.api.deps import get_db
 
 logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
 
 router = APIRouter()
 
-session_service = DatabaseSessionService(db_url=settings.DATABASE_URL)
+durable_session_service = WindowedSessionService(db_url=settings.DATABASE_URL)
+
+if settings.SESSION_STORE == "redis":
+    session_service = RedisSessionService(
+        redis_url=settings.REDIS_URL,
+        durable=durable_session_service,
+        idle_ttl=settings.SESSION_IDLE_TTL_SECONDS,
+        flush_interval=settings.SESSION_FLUSH_INTERVAL_SECONDS,
+        flush_batch=settings.SESSION_FLUSH_BATCH
+    )
+else:
+    session_service = durable_session_service
+
+agent_registry = AgentRegistry(session_service)
+
+# Identical first-turn questions (CHAT_COALESCE_FIRST_TURN) share one agent run
+chat_flight = make_single_flight("chat")
+
+# Concurrency limits per college and overall, shared by all workers
+chat_admission = make_admission_controller("chat")
+
+# Batch questions have no history: each is answered in "retrieve" mode on a throwaway in-memory session
+batch_agent_registry = AgentRegistry(InMemorySessionService())
+
+async def admit(college: str) -> Optional[str]:
+    """
+    Takes a chat admission slot for the college (release with chat_admission.release).
+    Raises 429 with Retry-After when the college's wait queue is full or the wait times out.
+    """
+    try:
+        with tracer.start_as_current_span("admission.acquire"):
+            return await chat_admission.acquire(college)
+    except AdmissionRejected as e:
+        logger.info(f"Chat rejected: {e}")
+        trace.get_current_span().set_attribute("admission.rejected", e.reason)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests are being processed right now. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+def stream_finalizer(college: str, span) -> tuple[Callable[[Optional[str]], None], Callable[[], Awaitable[None]]]:
+    """
+    (hold, finish) for a streaming response: hold(token) records the admission slot taken,
+    finish() releases it and ends the stream's span, once.
+    finish runs in the stream's finally and again as a response background task, which also
+    covers clients that disconnect before the stream starts (its finally then never runs)
+    and releases cancelled by a disconnect.
+    """
+    token = None
+    released = False
+
+    def hold(slot_token: Optional[str]):
+        nonlocal token
+        token = slot_token
+
+    async def finish():
+        nonlocal released
+        try:
+            if not released:
+                await chat_admission.release(college, token)
+                released = True
+        finally:
+            if span.is_recording():
+                span.end()
+
+    return hold, finish
+
+def chat_span_attributes(req: ChatRequest | BatchChatRequest) -> dict:
+    return {
+        "app.tenant": req.college,
+        "app.subject": req.subject,
+        "app.user_type": req.user_type,
+        "llm.provider": req.model,
+    }
+
+async def check_document_ready(db: AsyncSession, req: ChatRequest | BatchChatRequest):
+    """
+    Validates document existence based on College + Syllabus + Class + Subject.
+    Raises 400/409/404 when no COMPLETED textbook is available.
+    The status comes from the readiness cache, so the usual case needs no DB round trip.
+    """
+    status_found = await readiness_cache.get_status(db, req.college, req.syllabus, req.class_name, req.subject)
+
+    if status_found == "COMPLETED":
+        return
+
+    if status_found == "FAILED":
+        raise HTTPException(
+            status_code=400, 
+            detail=f"The textbook for {req.subject} (College: {req.college}) failed to process. Please delete and re-upload it."
+        )
+    elif status_found in ["PENDING", "PROCESSING"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"The textbook for {req.subject} is still processing. Please wait a moment."
+        )
+    else:
+        logger.warning(f"Chat rejected: No document for {req.college}/{req.syllabus}/{req.class_name}/{req.subject}")
+        raise HTTPException(
+            status_code=404, 
+            detail=f"No textbook found for {req.college} / {req.syllabus} / {req.class_name} / {req.subject}. Please upload documents first."
+        )
+
+def session_state(req: ChatRequest) -> dict:
+    """Search filters read by syllabus_tool from tool_context.state."""
+    return {
+        "college": req.college,
+        "syllabus": req.syllabus,
+        "class_name": req.class_name,
+        "subject": req.subject
+    }
+
+async def prepare_session(req: ChatRequest):
+    """
+    Loads (or creates) the ADK session (only the recent history window is read).
+    The filters are also passed to run_async as state_delta: the runner re-reads the
+    session from the service, so edits to this object alone would not reach the tool.
+    """
+    session = await session_service.get_session(
+        app_name=settings.PROJECT_NAME,
+        user_id=settings.USER_ID,
+        session_id=req.chatbot_user_id
+    )
+    
+    if not session:
+        session = await session_service.create_session(
+            app_name=settings.PROJECT_NAME,
+            user_id=settings.USER_ID,
+            session_id=req.chatbot_user_id,
+            state=session_state(req)
+        )
+
+    session.state.update(session_state(req))
+    return session
+
+def chat_mode(req: ChatRequest) -> str:
+    mode = req.mode or settings.CHAT_MODE
+    if mode not in CHAT_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid chat mode: {mode}")
+    return mode
+
+def search_filters(req: ChatRequest | BatchChatRequest) -> dict:
+    return {
+        "school_name": req.college,
+        "syllabus": req.syllabus,
+        "class_name": req.class_name,
+        "subject": req.subject
+    }
+
+async def retrieve_context(
+    req: ChatRequest, query_vec: Optional[list[float]] = None, result: Optional[dict] = None
+) -> tuple[str, dict]:
+    """
+    "retrieve" mode: runs the syllabus search up front for the question
+    (with query_vec, if the question was already embedded), unless its result is given.
+    Returns the [Textbook Context] message part and the search result, whose
+    "status" and "found" match what the search_syllabus tool reports.
+    """
+    if result is None:
+        try:
+            result = await search_syllabus_context(req.question, search_filters(req), query_vec=query_vec)
+        except Exception as e:
+            logger.error(f"Up-front retrieval failed: {e}", exc_info=True)
+            result = {"status": "error", "found": False, "message": "The textbook could not be searched right now."}
+
+    body = result["context"] if result.get("found") else result.get("message")
+    return f"{CONTEXT_MARKER}\n{body}", result
+
+def build_user_message(req: ChatRequest, context: Optional[str] = None) -> types.Content:
+    """User turn; the retrieved context (if any) goes in its own part so history replay can drop it."""
+    dynamic_context_header = (
+        f"[System Context]\n"
+        f"College: {req.college}\n"
+        f"Syllabus: {req.syllabus}\n"
+        f"Class: {req.class_name}\n"
+        f"Subject: {req.subject}\n"
+        f"--------------------\n"
+    )
+    
+    full_prompt = f"{dynamic_context_header}\nUser Question: {req.question}"
+
+    parts = [types.Part(text=context)] if context else []
+    parts.append(types.Part(text=full_prompt))
+    return types.Content(role='user', parts=parts)
+
+async def run_agent(runner, req: ChatRequest, user_msg: types.Content) -> tuple[str, Optional[str]]:
+    """
+    Runs one turn to completion. Returns the final answer text and the status of the
+    turn's last search_syllabus result (None if the agent didn't search).
+    """
+    final_text = "Error generating response."
+    search_status = None
+    async for event in runner.run_async(
+        user_id=settings.USER_ID, 
+        session_id=req.chatbot_user_id, 
+        new_message=user_msg,
+        state_delta=session_state(req)
+    ):
+        for response in event.get_function_responses():
+            if response.name == "search_syllabus":
+                search_status = (response.response or {}).get("status")
+        if event.is_final_response():
+            final_text = event.content.parts[0].text
+    return final_text, search_status
+
+async def record_shared_turn(req: ChatRequest, user_msg: types.Content, answer: str, agent_name: str):
+    """Stores a turn answered by another request's agent run, so the session history stays complete."""
+    session = await session_service.get_session(
+        app_name=settings.PROJECT_NAME,
+        user_id=settings.USER_ID,
+        session_id=req.chatbot_user_id
+    )
+    invocation_id = Event.new_id()
+    await session_service.append_event(session, Event(
+        author="user",
+        invocation_id=invocation_id,
+        content=user_msg,
+        actions=EventActions(state_delta=session_state(req))
+    ))
+    await session_service.append_event(session, Event(
+        author=agent_name,
+        invocation_id=invocation_id,
+        content=types.Content(role="model", parts=[types.Part(text=answer)])
+    ))
+
+def event_text(event) -> str:
+    """Concatenated visible text of an ADK event (thought parts excluded)."""
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(p.text for p in event.content.parts if p.text and not p.thought)
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(
     req: ChatRequest,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Chat endpoint with smart status checking.
     Validates document existence based on College + Syllabus + Class + Subject.
+    Runs under the college's admission limits (429 + Retry-After when overloaded).
     """
-    
-    stmt_success = select(exists().where(
-        and_(
-            Document.school_name == req.college,
-            Document.syllabus == req.syllabus,
-            Document.class_name == req.class_name,
-            Document.subject == req.subject,
-            Document.status == "COMPLETED"
-        )
-    ))
-    result_success = await db.execute(stmt_success)
-    
-    if not result_success.scalar():
-        stmt_any = select(Document.status).where(
-            and_(
-                Document.school_name == req.college,
-                Document.syllabus == req.syllabus,
-                Document.class_name == req.class_name,
-                Document.subject == req.subject
-            )
-        ).limit(1)
-        
-        result_any = await db.execute(stmt_any)
-        status_found = result_any.scalar()
+    with tracer.start_as_current_span("chat", attributes=chat_span_attributes(req)):
+        token = await admit(req.college)
+        try:
+            return await answer_chat(req, background_tasks, db)
+        finally:
+            await chat_admission.release(req.college, token)
 
-        if status_found == "FAILED":
-            raise HTTPException(
-                status_code=400, 
-                detail=f"The textbook for {req.subject} (College: {req.college}) failed to process. Please delete and re-upload it."
-            )
-        elif status_found in ["PENDING", "PROCESSING"]:
-            raise HTTPException(
-                status_code=409,
-                detail=f"The textbook for {req.subject} is still processing. Please wait a moment."
-            )
-        else:
-            logger.warning(f"Chat rejected: No document for {req.college}/{req.syllabus}/{req.class_name}/{req.subject}")
-            raise HTTPException(
-                status_code=404, 
-                detail=f"No textbook found for {req.college} / {req.syllabus} / {req.class_name} / {req.subject}. Please upload documents first."
-            )
+async def answer_chat(req: ChatRequest, background_tasks: BackgroundTasks, db: AsyncSession) -> ChatResponse:
+    await check_document_ready(db, req)
 
     session_id = req.chatbot_user_id
 
     if not req.model:
         raise HTTPException(status_code=400, detail="Model provider must be specified")
 
+    mode = chat_mode(req)
+
     try:
-        session = await session_service.get_session(
-            app_name=settings.PROJECT_NAME,
-            user_id=settings.USER_ID,
-            session_id=session_id
+        session = await prepare_session(req)
+        
+        runner = agent_registry.get_runner(
+            model_provider=req.model,
+            user_type=req.user_type,
+            mode=mode
         )
         
-        if not session:
-            session = await session_service.create_session(
-                app_name=settings.PROJECT_NAME,
-                user_id=settings.USER_ID,
-                session_id=session_id
+        first_turn = is_first_turn(session)
+        subject = (req.college, req.syllabus, req.class_name, req.subject)
+        trace.get_current_span().set_attributes({"chat.mode": mode, "chat.first_turn": first_turn})
+
+        question_vec = None
+        if settings.ANSWER_CACHE_ENABLED and first_turn:
+            with tracer.start_as_current_span("answer_cache.lookup") as span:
+                try:
+                    question_vec = await LLMFactory.get_embedding(req.question)
+                    cached = await AnswerCacheService.lookup(db, subject, req.user_type, question_vec)
+                except Exception as e:
+                    logger.warning(f"Answer cache lookup failed: {e}")
+                    cached = None
+                span.set_attribute("answer_cache.hit", cached is not None)
+
+            if cached is not None:
+                await record_shared_turn(req, build_user_message(req), cached.answer, runner.agent.name)
+                background_tasks.add_task(AnswerCacheService.record_hit, cached.id)
+                return ChatResponse(answer=cached.answer)
+
+        context = None
+        search_status = None
+        if mode == "retrieve":
+            context, search = await retrieve_context(req)
+            search_status = search.get("status")
+
+        user_msg = build_user_message(req, context)
+
+        ran_here = True
+        if settings.CHAT_COALESCE_FIRST_TURN and first_turn:
+            # Without history the answer depends only on the question and its subject
+            ran_here = False
+
+            async def run():
+                nonlocal ran_here, search_status
+                ran_here = True
+                answer, tool_status = await run_agent(runner, req, user_msg)
+                search_status = tool_status or search_status
+                return answer
+
+            key = flight_key(
+                req.college, req.syllabus, req.class_name, req.subject,
+                req.user_type, req.model, mode, normalize_query(req.question)
             )
+            final_text = await chat_flight.do(key, run)
+            trace.get_current_span().set_attribute("chat.coalesced", not ran_here)
+            if not ran_here:
+                await record_shared_turn(req, user_msg, final_text, runner.agent.name)
+        else:
+            final_text, tool_status = await run_agent(runner, req, user_msg)
+            search_status = tool_status or search_status
 
-        session.state["college"] = req.college
-        session.state["syllabus"] = req.syllabus
-        session.state["class_name"] = req.class_name
-        session.state["subject"] = req.subject
-        
-        agent = get_agent(
-            model_provider=req.model,
-            user_type=req.user_type
+        # Only answers grounded in a successful search, stored once by the request that produced them
+        if question_vec is not None and ran_here and search_status == "success" and final_text != "Error generating response.":
+            background_tasks.add_task(
+                AnswerCacheService.store, subject, req.user_type, req.question, question_vec, final_text
             )
-        runner = Runner(
-            agent=agent, 
-            app_name=settings.PROJECT_NAME, 
-            session_service=session_service
-        )
-        
-        dynamic_context_header = (
-            f"[System Context]\n"
-            f"College: {req.college}\n"
-            f"Syllabus: {req.syllabus}\n"
-            f"Class: {req.class_name}\n"
-            f"Subject: {req.subject}\n"
-            f"--------------------\n"
-        )
-        
-        full_prompt = f"{dynamic_context_header}\nUser Question: {req.question}"
-        
-        user_msg = types.Content(role='user', parts=[types.Part(text=full_prompt)])
-        final_text = "Error generating response."
 
-        async for event in runner.run_async(
-            user_id=settings.USER_ID, 
-            session_id=session_id, 
-            new_message=user_msg
-        ):
-            if event.is_final_response():
-                final_text = event.content.parts[0].text
+        if needs_compaction(session):
+            # Summarise turns leaving the history window once the response has been sent
+            background_tasks.add_task(
+                compact_session_history, session_service, settings.PROJECT_NAME, settings.USER_ID, session_id
+            )
 
         return ChatResponse(answer=final_text)
         
@@ -131,6 +374,297 @@ async def chat_endpoint(
         logger.error(f"Agent execution error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An internal error occurred while processing your request.")
 
+@router.post("/chat/stream")
+async def chat_stream_endpoint(
+    req: ChatRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+    Emits `token` events as text is generated, `tool_call` / `tool_result` progress events
+    (also for the up-front search in "retrieve" mode),
+    and a final `done` event with the full answer and timings (all in ms from request start).
+    Validation and admission (429) errors are returned as normal HTTP errors before the stream starts;
+    the admission slot is held until the stream ends.
+    """
+    started = time.perf_counter()
+    elapsed_ms = lambda: round((time.perf_counter() - started) * 1000, 1)
+
+    # Ended by the stream, which outlives this function
+    span = tracer.start_span("chat.stream", attributes=chat_span_attributes(req))
+    hold, finish = stream_finalizer(req.college, span)
+    try:
+        with trace.use_span(span, end_on_exit=False):
+            hold(await admit(req.college))
+            await check_document_ready(db, req)
+
+            if not req.model:
+                raise HTTPException(status_code=400, detail="Model provider must be specified")
+
+            mode = chat_mode(req)
+            span.set_attribute("chat.mode", mode)
+
+            try:
+                session = await prepare_session(req)
+                runner = agent_registry.get_runner(model_provider=req.model, user_type=req.user_type, mode=mode)
+            except Exception as e:
+                logger.error(f"Agent setup error: {e}", exc_info=True)
+                raise HTTPException(status_code=500, detail="An internal error occurred while processing your request.")
+    except BaseException:
+        await finish()
+        raise
+
+    preflight_ms = elapsed_ms()
+
+    async def event_stream():
+        ttft_ms = None
+        tool_ms = 0.0
+        tool_started = {}
+        streamed = []
+        final_text = ""
+
+        with trace.use_span(span, end_on_exit=False):
+            try:
+                context = None
+                if mode == "retrieve":
+                    # Reported with the same progress events as the agent's own tool call
+                    yield {"event": "tool_call", "data": json.dumps({"name": "search_syllabus", "args": {"query": req.question}, "at_ms": elapsed_ms()})}
+                    retrieval_started = time.perf_counter()
+                    context, result = await retrieve_context(req)
+                    tool_ms += (time.perf_counter() - retrieval_started) * 1000
+                    yield {"event": "tool_result", "data": json.dumps({
+                        "name": "search_syllabus",
+                        "status": result.get("status"),
+                        "found": bool(result.get("found")),
+                        "at_ms": elapsed_ms()
+                    })}
+
+                user_msg = build_user_message(req, context)
+
+                async for event in runner.run_async(
+                    user_id=settings.USER_ID,
+                    session_id=req.chatbot_user_id,
+                    new_message=user_msg,
+                    state_delta=session_state(req),
+                    run_config=RunConfig(streaming_mode=StreamingMode.SSE)
+                ):
+                    for call in event.get_function_calls():
+                        tool_started[call.id] = time.perf_counter()
+                        yield {"event": "tool_call", "data": json.dumps({"name": call.name, "args": call.args, "at_ms": elapsed_ms()})}
+
+                    for response in event.get_function_responses():
+                        if response.id in tool_started:
+                            tool_ms += (time.perf_counter() - tool_started.pop(response.id)) * 1000
+                        payload = response.response or {}
+                        yield {"event": "tool_result", "data": json.dumps({
+                            "name": response.name,
+                            "status": payload.get("status"),
+                            "found": payload.get("found"),
+                            "at_ms": elapsed_ms()
+                        })}
+
+                    text = event_text(event)
+                    if event.partial and text:
+                        if ttft_ms is None:
+                            ttft_ms = elapsed_ms()
+                        streamed.append(text)
+                        yield {"event": "token", "data": json.dumps({"text": text})}
+                    elif event.is_final_response():
+                        final_text = text or "".join(streamed)
+                        if ttft_ms is None:
+                            ttft_ms = elapsed_ms()
+
+                span.set_attributes({"chat.ttft_ms": ttft_ms or 0.0, "chat.tool_ms": round(tool_ms, 1)})
+                yield {"event": "done", "data": json.dumps({
+                    "answer": final_text or "Error generating response.",
+                    "timings": {
+                        "preflight_ms": preflight_ms,
+                        "ttft_ms": ttft_ms,
+                        "tool_ms": round(tool_ms, 1),
+                        "total_ms": elapsed_ms()
+                    }
+                })}
+
+            except Exception as e:
+                logger.error(f"Agent streaming error: {e}", exc_info=True)
+                yield {"event": "error", "data": json.dumps({"detail": "An internal error occurred while processing your request."})}
+            finally:
+                await finish()
+
+    background = BackgroundTasks()
+    background.add_task(finish)
+    if needs_compaction(session):
+        background.add_task(
+            compact_session_history, session_service, settings.PROJECT_NAME, settings.USER_ID, req.chatbot_user_id
+        )
+    return EventSourceResponse(event_stream(), background=background)
+
+async def prepare_batch(db: AsyncSession, req: BatchChatRequest) -> list[Optional[list[float]]]:
+    """
+    Validates a batch once (size, textbook readiness) and embeds all its questions in one call.
+    If the batch embedding fails, every question is embedded on its own during retrieval instead.
+    """
+    if len(req.questions) > settings.BATCH_CHAT_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many questions: at most {settings.BATCH_CHAT_MAX_QUESTIONS} per batch."
+        )
+
+    await check_document_ready(db, req)
+
+    try:
+        return await LLMFactory.get_query_embeddings(req.questions)
+    except Exception as e:
+        logger.warning(f"Batch embedding failed, embedding questions one by one: {e}")
+        return [None] * len(req.questions)
+
+def search_batch(req: BatchChatRequest, query_vecs: list[Optional[list[float]]]) -> list[Optional[dict]]:
+    """
+    Searches all questions of a batch in one pass where the search mode allows it (numpy).
+    Questions without a result here are searched on their own by answer_batch_item.
+    """
+    results = None
+    if all(vec is not None for vec in query_vecs):
+        try:
+            results = search_syllabus_batch(search_filters(req), query_vecs)
+        except Exception as e:
+            logger.warning(f"Batch search failed, searching questions one by one: {e}")
+    return results or [None] * len(query_vecs)
+
+async def answer_batch_item(
+    req: BatchChatRequest,
+    index: int,
+    query_vec: Optional[list[float]],
+    search: Optional[dict],
+    semaphore: asyncio.Semaphore
+) -> BatchChatItem:
+    """
+    Answers one batch question (search, unless already searched with the batch, + one model call)
+    on an admission slot of the college, so a batch counts against ADMISSION_TENANT_LIMIT like that
+    many /chat requests. Failures, including admission rejections, are reported on the item.
+    """
+    question = req.questions[index]
+    item_req = ChatRequest(
+        chatbot_user_id=f"batch-{uuid.uuid4()}",
+        question=question,
+        college=req.college,
+        syllabus=req.syllabus,
+        class_name=req.class_name,
+        subject=req.subject,
+        user_type=req.user_type,
+        model=req.model,
+        mode="retrieve"
+    )
+
+    async with semaphore:
+        with tracer.start_as_current_span("chat.batch.item", attributes={"batch.index": index}):
+            try:
+                token = await chat_admission.acquire(req.college)
+            except AdmissionRejected as e:
+                logger.info(f"Batch question {index} rejected: {e}")
+                return BatchChatItem(index=index, question=question, error="Too many requests are being processed right now. Please retry shortly.")
+
+            runner = None
+            try:
+                runner = batch_agent_registry.get_runner(model_provider=req.model, user_type=req.user_type, mode="retrieve")
+                await runner.session_service.create_session(
+                    app_name=settings.PROJECT_NAME,
+                    user_id=settings.USER_ID,
+                    session_id=item_req.chatbot_user_id,
+                    state=session_state(item_req)
+                )
+                context, _ = await retrieve_context(item_req, query_vec, search)
+                answer, _ = await run_agent(runner, item_req, build_user_message(item_req, context))
+                return BatchChatItem(index=index, question=question, answer=answer)
+            except Exception as e:
+                logger.error(f"Batch question {index} failed: {e}", exc_info=True)
+                return BatchChatItem(index=index, question=question, error="An internal error occurred while answering this question.")
+            finally:
+                await chat_admission.release(req.college, token)
+                if runner is not None:
+                    await runner.session_service.delete_session(
+                        app_name=settings.PROJECT_NAME, user_id=settings.USER_ID, session_id=item_req.chatbot_user_id
+                    )
+
+def start_batch(req: BatchChatRequest, query_vecs: list) -> list[asyncio.Task]:
+    """One task per question; at most BATCH_CHAT_CONCURRENCY of them search/generate at a time."""
+    searches = search_batch(req, query_vecs)
+    semaphore = asyncio.Semaphore(settings.BATCH_CHAT_CONCURRENCY)
+    return [
+        asyncio.create_task(answer_batch_item(req, index, query_vec, search, semaphore))
+        for index, (query_vec, search) in enumerate(zip(query_vecs, searches))
+    ]
+
+@router.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch_endpoint(
+    req: BatchChatRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Answers a list of independent questions on one subject (e.g. a teacher's question bank).
+    Readiness is checked once, the questions are embedded in a single call and answered
+    concurrently; results come back in question order.
+    Each question takes its own admission slot of the college while it is answered.
+    """
+    attributes = chat_span_attributes(req) | {"batch.questions": len(req.questions)}
+    with tracer.start_as_current_span("chat.batch", attributes=attributes):
+        query_vecs = await prepare_batch(db, req)
+        tasks = start_batch(req, query_vecs)
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+    return BatchChatResponse(results=results)
+
+@router.post("/chat/batch/stream")
+async def chat_batch_stream_endpoint(
+    req: BatchChatRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Streaming variant of /chat/batch using Server-Sent Events.
+    Emits an `item` event as each question is answered (completion order, see `index`)
+    and a final `done` event with counts and the total time.
+    Validation errors are returned as normal HTTP errors before the stream starts.
+    """
+    started = time.perf_counter()
+    # Ended by the stream, which outlives this function
+    attributes = chat_span_attributes(req) | {"batch.questions": len(req.questions)}
+    span = tracer.start_span("chat.batch.stream", attributes=attributes)
+    # Items take their own admission slots, so only the span is held here
+    _, finish = stream_finalizer(req.college, span)
+    try:
+        with trace.use_span(span, end_on_exit=False):
+            query_vecs = await prepare_batch(db, req)
+    except BaseException:
+        await finish()
+        raise
+
+    async def event_stream():
+        with trace.use_span(span, end_on_exit=False):
+            tasks = start_batch(req, query_vecs)
+            failed = 0
+            try:
+                for next_item in asyncio.as_completed(tasks):
+                    item = await next_item
+                    failed += item.error is not None
+                    yield {"event": "item", "data": item.model_dump_json()}
+
+                span.set_attribute("batch.failed", failed)
+                yield {"event": "done", "data": json.dumps({
+                    "count": len(tasks),
+                    "failed": failed,
+                    "total_ms": round((time.perf_counter() - started) * 1000, 1)
+                })}
+            finally:
+                # Client went away: stop the questions still queued or running
+                for task in tasks:
+                    task.cancel()
+                await finish()
+
+    return EventSourceResponse(event_stream(), background=BackgroundTask(finish))
+
 @router.post("/clear_session")
 async def clear_session(req: ClearSessionRequest):
     """
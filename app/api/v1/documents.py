@@ -11,7 +11,9 @@ from app.api.deps import get_db, get_current_user
 from app.models.document import Document
 from app.models.school import School, Syllabus, Class, Subject 
 from app.schemas.document import DocumentResponse, DocumentUrlRequest, SubjectSearchRequest, DocumentListRequest
-from app.worker.tasks import ingest_pdf_task
+from app.worker.tasks import ingest_pdf_task, rebuild_subject_index_task
+from app.services.readiness import readiness_cache
+from app.services.answer_cache import AnswerCacheService
 from app.config import settings
 
 router = APIRouter()
@@ -66,8 +68,24 @@ async def handle_file_upload(doc_id: str, file: UploadFile) -> str:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {e}")
 
+def subject_key(doc: Document) -> tuple:
+    return (doc.school_name, doc.syllabus, doc.class_name, doc.subject)
+
+async def subjects_changed(db: AsyncSession, *keys: tuple):
+    """Refreshes readiness and drops cached answers of subjects whose documents changed."""
+    await readiness_cache.refresh(db, *keys)
+    await AnswerCacheService.invalidate(db, *keys)
+
+def queue_subject_index_rebuild(*keys: tuple):
+    """Refreshes the NumPy vector index of the given subjects (only used when SEARCH_MODE=numpy)."""
+    if settings.SEARCH_MODE != "numpy":
+        return
+    for key in set(keys):
+        rebuild_subject_index_task.delay(*key)
+
 async def update_document_logic(db: AsyncSession, doc: Document, file_path: str = None, source_url: str = None, meta: dict = None):
     should_ingest = False
+    old_key = subject_key(doc)
 
     if meta:
         if any(k in meta for k in ['school', 'syllabus', 'class_name', 'subject']):
@@ -112,6 +130,11 @@ async def update_document_logic(db: AsyncSession, doc: Document, file_path: str
         await db.commit()
         await db.refresh(doc)
 
+    await subjects_changed(db, old_key, subject_key(doc))
+
+    if subject_key(doc) != old_key:
+        queue_subject_index_rebuild(old_key, *([] if should_ingest else [subject_key(doc)]))
+
     return doc
 
 
@@ -124,6 +147,7 @@ async def create_document_url(data: DocumentUrlRequest, db: AsyncSession = Depen
     db.add(new_doc)
     await db.commit()
     await db.refresh(new_doc)
+    await subjects_changed(db, subject_key(new_doc))
     ingest_pdf_task.delay(str(new_doc.id))
     return new_doc
 
@@ -145,6 +169,7 @@ async def create_document_upload(file: UploadFile = File(...), body: str = Form(
     db.add(new_doc)
     await db.commit()
     await db.refresh(new_doc)
+    await subjects_changed(db, subject_key(new_doc))
     ingest_pdf_task.delay(str(new_doc.id))
     return new_doc
 
@@ -210,8 +235,11 @@ async def delete_doc(doc_id: str, db: AsyncSession = Depends(get_db), user=Depen
         try: os.remove(doc.file_path)
         except OSError: pass
             
+    key = subject_key(doc)
     await db.delete(doc)
     await db.commit()
+    await subjects_changed(db, key)
+    queue_subject_index_rebuild(key)
     return {"message": "Deleted"}
 
 @router.post("/document/subject/search", response_model=List[str])
@@ -30,7 +30,129 @@ class Settings(BaseSettings):
     DEEPSEEK_MODEL_NAME: str = "deepseek-chat"
     
     GEMINI_EMBEDDING_MODEL_NAME: str = "models/gemini-embedding-001"
-    
+
+    SEARCH_LIMIT: int = 6
+
+    # Chat mode: "agent" (model decides to call search_syllabus) or "retrieve"
+    # (search first, answer in a single model call); overridable per request
+    CHAT_MODE: str = "agent"
+
+    # Provider routing: on failure (or when hedging) the requested provider is backed by the
+    # PROVIDER_FALLBACKS providers that have an API key. Hedging starts the next provider when the
+    # first has not answered within its rolling p95 (PROVIDER_HEDGE_DEFAULT_DELAY_MS until enough samples)
+    PROVIDER_ROUTING_ENABLED: bool = False
+    PROVIDER_FALLBACKS: str = "gemini,openai,deepseek"
+    PROVIDER_HEDGE_ENABLED: bool = False
+    PROVIDER_HEDGE_DEFAULT_DELAY_MS: int = 3000
+    PROVIDER_HEDGE_MIN_DELAY_MS: int = 300
+    PROVIDER_STATS_WINDOW: int = 200
+    PROVIDER_STATS_MIN_SAMPLES: int = 20
+    # Providers above this rolling error rate are tried last until a cooldown passes without failures
+    PROVIDER_MAX_ERROR_RATE: float = 0.5
+    PROVIDER_UNHEALTHY_COOLDOWN_SECONDS: int = 30
+
+    # Provider prompt caching: ADK context caches for Gemini (recreated every PROMPT_CACHE_INTERVALS
+    # invocations) and OpenAI prompt_cache_key hints. Off by default: ADK caches per session (system
+    # prompt + tools + that session's history), and the system prompts alone (~600 tokens) are below
+    # the providers' 1024-token minimum, so enabling it mostly adds a cache per session.
+    # Requests below PROMPT_CACHE_MIN_TOKENS (estimated) are sent as-is
+    PROMPT_CACHE_ENABLED: bool = False
+    PROMPT_CACHE_TTL_SECONDS: int = 3600
+    PROMPT_CACHE_MIN_TOKENS: int = 1024
+    PROMPT_CACHE_INTERVALS: int = 10
+
+    # Admission control for the chat endpoints, shared by all workers via Redis: requests in flight
+    # overall and per college; a request without a slot waits in its college's bounded queue for up to
+    # ADMISSION_QUEUE_TIMEOUT_SECONDS, otherwise it gets 429 with Retry-After. Slots of crashed workers
+    # expire after ADMISSION_LEASE_SECONDS (keep it above the longest chat/stream)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_GLOBAL_LIMIT: int = 60
+    ADMISSION_TENANT_LIMIT: int = 15
+    ADMISSION_QUEUE_SIZE: int = 20
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    ADMISSION_LEASE_SECONDS: int = 300
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+
+    # Batch chat (/chat/batch): questions per request and concurrent model calls per request
+    BATCH_CHAT_MAX_QUESTIONS: int = 50
+    BATCH_CHAT_CONCURRENCY: int = 5
+
+    # Query embedding cache (in-process LRU + shared Redis tier)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_REDIS: bool = True
+    EMBEDDING_CACHE_SIZE: int = 10000
+    EMBEDDING_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # Subject readiness cache used by /chat pre-flight (in-process + Redis, refreshed on document changes)
+    READINESS_CACHE_ENABLED: bool = True
+    READINESS_CACHE_TTL_SECONDS: int = 3600
+    READINESS_CACHE_LOCAL_TTL_SECONDS: int = 5
+
+    # ANN index over chunks.embedding ("hnsw" or "ivfflat")
+    VECTOR_INDEX_TYPE: str = "hnsw"
+    HNSW_EF_SEARCH: int = 40
+    IVFFLAT_LISTS: int = 100
+    IVFFLAT_PROBES: int = 10
+    VECTOR_ITERATIVE_SCAN: Optional[str] = None
+
+    # First-pass format: "full" (vector), "halfvec", "binary" or "matryoshka" (256-d prefix);
+    # non-full first passes fetch RERANK_CANDIDATES rows which are re-ranked at full precision
+    EMBEDDING_STORAGE: str = "full"
+    RERANK_CANDIDATES: int = 40
+
+    # Retrieval mode: "vector" (cosine only) or "hybrid" (full-text + vector, fused with RRF)
+    SEARCH_MODE: str = "vector"
+    HYBRID_LEXICAL_CANDIDATES: int = 20
+    HYBRID_VECTOR_CANDIDATES: int = 10
+    RRF_K: int = 60
+
+    # Context assembly for search results (dedupe, MMR, neighbour merge, token budget)
+    CONTEXT_TOKEN_BUDGET: int = 3000
+    CONTEXT_MMR_LAMBDA: float = 0.7
+    CONTEXT_TOKEN_ENCODING: str = "cl100k_base"
+
+    # SEARCH_MODE="numpy": per-subject exact search over mmap'd .npy exports (shared by all workers)
+    NUMPY_INDEX_DIR: str = "./uploads/vector_index"
+    NUMPY_INDEX_DTYPE: str = "float32"
+
+    # Single-flight coalescing of identical concurrent work (per worker + across workers via Redis)
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_REDIS: bool = True
+    SINGLE_FLIGHT_TIMEOUT_SECONDS: float = 30.0
+    SINGLE_FLIGHT_RESULT_TTL_SECONDS: int = 5
+    # Also share answers between identical first-turn /chat questions of the same subject
+    CHAT_COALESCE_FIRST_TURN: bool = False
+
+    # Semantic cache of first-turn answers per subject + user type (cleared when the subject is re-ingested)
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL_HOURS: int = 7 * 24
+
+    # Chat history: last HISTORY_RECENT_TURNS turns are replayed verbatim, older turns are
+    # summarised in the background once HISTORY_COMPACT_BATCH more have accumulated
+    HISTORY_WINDOW_ENABLED: bool = True
+    HISTORY_RECENT_TURNS: int = 6
+    HISTORY_COMPACT_BATCH: int = 4
+    HISTORY_SUMMARY_MODEL: Optional[str] = None
+
+    # Chat session store: "database" (ADK DatabaseSessionService) or "redis" (hot sessions in Redis,
+    # written back to Postgres in batches by a background flusher)
+    SESSION_STORE: str = "database"
+    SESSION_IDLE_TTL_SECONDS: int = 3600
+    SESSION_FLUSH_INTERVAL_SECONDS: float = 0.5
+    SESSION_FLUSH_BATCH: int = 100
+
+    # Request tracing (OpenTelemetry): "none", "console" or "otlp" (OTLP/HTTP, e.g. a local
+    # collector or Jaeger); TRACING_SAMPLE_RATIO is the share of requests traced
+    TRACING_EXPORTER: str = "none"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SERVICE_NAME: str = "syllabus-qa"
+    TRACING_SAMPLE_RATIO: float = 1.0
+
+    # Prometheus metrics: /metrics on the API (aggregated over the gunicorn workers via
+    # PROMETHEUS_MULTIPROC_DIR) and CELERY_METRICS_PORT on the Celery worker (0 = off)
+    METRICS_ENABLED: bool = True
+    CELERY_METRICS_PORT: int = 9808
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,183 @@
+import os
+import time
+import logging
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from starlette.requests import Request
+from starlette.responses import Response
+from app.core.tracing import routed_provider
+
+logger = logging.getLogger(__name__)
+
+# Multi-process mode (gunicorn / Celery prefork): every process writes its samples to
+# PROMETHEUS_MULTIPROC_DIR and a scrape aggregates the files of all processes.
+# The directory is cleared at server start (gunicorn.conf.py / start_celery_metrics_server).
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+# API
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency (streams: until the last byte)",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+
+# Retrieval
+RETRIEVAL_LATENCY = Histogram(
+    "retrieval_duration_seconds", "Chunk search latency, including the query embedding",
+    ["mode"], buckets=LATENCY_BUCKETS
+)
+RETRIEVAL_RESULTS = Histogram(
+    "retrieval_results", "Chunks returned per search", ["mode"], buckets=(0, 1, 2, 3, 5, 8, 13, 20, 40)
+)
+
+# Embeddings (LLMFactory)
+EMBEDDING_CALLS = Counter("embedding_calls_total", "Embedding API calls", ["kind"])
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size", "Texts per embedding API call", ["kind"], buckets=(1, 2, 5, 10, 20, 50, 100, 250)
+)
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "embedding_cache_lookups_total", "Query embedding cache lookups by result (local_hit, redis_hit, miss)", ["result"]
+)
+
+# LLM
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "Model call latency until the final response", ["provider"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Model tokens by kind (input, output, cached input)", ["provider", "kind"])
+
+# SQLAlchemy pools (summed over live processes)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections checked out of the pool", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections open beyond pool_size", ["pool"], multiprocess_mode="livesum"
+)
+
+# Ingestion (Celery)
+INGEST_DOCUMENTS = Counter("ingest_documents_total", "Documents ingested", ["status"])
+INGEST_PAGES = Counter("ingest_pages_total", "PDF pages ingested")
+INGEST_CHUNKS = Counter("ingest_chunks_total", "Chunks stored")
+INGEST_EMBEDDINGS = Counter("ingest_embeddings_total", "Chunk embeddings generated")
+INGEST_DURATION = Histogram(
+    "ingest_duration_seconds", "Document ingestion time", buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200)
+)
+
+
+def metrics_registry():
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus exposition of all worker processes."""
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """
+    Records HTTP_REQUEST_LATENCY per route template (e.g. /api/v1/document/{doc_id}/view)
+    so path parameters don't create new series. Mounted apps are reported under their mount path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or scope.get("root_path") or "unmatched"
+            HTTP_REQUEST_LATENCY.labels(scope["method"], path, str(status)).observe(time.perf_counter() - started)
+
+
+def instrument_pool(engine, name: str):
+    """Keeps DB_POOL_CHECKED_OUT / DB_POOL_OVERFLOW of a (sync) engine's pool current."""
+    from sqlalchemy import event
+
+    # Counted here: during "checkin" the pool still reports the connection as checked out
+    def checkout(*_):
+        DB_POOL_CHECKED_OUT.labels(name).inc()
+        DB_POOL_OVERFLOW.labels(name).set(max(engine.pool.overflow(), 0))
+
+    def checkin(*_):
+        DB_POOL_CHECKED_OUT.labels(name).dec()
+        DB_POOL_OVERFLOW.labels(name).set(max(engine.pool.overflow(), 0))
+
+    event.listen(engine, "checkout", checkout)
+    event.listen(engine, "checkin", checkin)
+
+
+_llm_started: ContextVar[Optional[float]] = ContextVar("llm_started", default=None)
+
+
+def start_llm_timer(callback_context, llm_request):
+    """before_model_callback for agents, paired with llm_metrics_recorder."""
+    _llm_started.set(time.perf_counter())
+    return None
+
+
+def llm_metrics_recorder(model_provider: str):
+    """
+    after_model_callback for agents: LLM_LATENCY and LLM_TOKENS of the final response,
+    labelled with the provider that answered (after a failover, not the requested one).
+    """
+    def record(callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        provider = routed_provider.get() or model_provider
+        started = _llm_started.get()
+        if started is not None:
+            LLM_LATENCY.labels(provider).observe(time.perf_counter() - started)
+            _llm_started.set(None)
+        usage = llm_response.usage_metadata
+        if usage:
+            LLM_TOKENS.labels(provider, "input").inc(usage.prompt_token_count or 0)
+            LLM_TOKENS.labels(provider, "output").inc(usage.candidates_token_count or 0)
+            LLM_TOKENS.labels(provider, "cached").inc(usage.cached_content_token_count or 0)
+        return None
+
+    return record
+
+
+def start_celery_metrics_server(port: int):
+    """
+    Serves /metrics of a Celery worker (main process + pool children) on its own port.
+    Call from the main process before the pool starts.
+    """
+    if MULTIPROC_DIR:
+        for name in os.listdir(MULTIPROC_DIR):
+            if name.endswith(".db"):
+                os.remove(os.path.join(MULTIPROC_DIR, name))
+
+    from prometheus_client import start_http_server
+    start_http_server(port, registry=metrics_registry())
+    logger.info(f"Celery metrics served on :{port}")
+
+
+def mark_process_dead(pid: int):
+    """Drops the live gauges of an exited worker process (multi-process mode)."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,49 @@
+import threading
+from typing import Any, Optional
+import redis
+import redis.asyncio as aioredis
+from cachetools import TTLCache
+
+
+class LazyRedis:
+    """
+    Sync and asyncio Redis clients for one URL, created on first use so that importing a
+    service never connects. Without a URL both are None and callers skip Redis.
+    Short timeouts by default: callers treat Redis errors as cache misses / fall back.
+    """
+
+    def __init__(self, url: Optional[str], timeout: float = 0.2):
+        self.url = url
+        self.timeout = timeout
+        self._sync = None
+        self._async = None
+
+    def sync(self) -> Optional[redis.Redis]:
+        if self._sync is None and self.url:
+            self._sync = redis.Redis.from_url(self.url, socket_timeout=self.timeout, socket_connect_timeout=self.timeout)
+        return self._sync
+
+    def aio(self) -> Optional[aioredis.Redis]:
+        if self._async is None and self.url:
+            self._async = aioredis.Redis.from_url(self.url, socket_timeout=self.timeout, socket_connect_timeout=self.timeout)
+        return self._async
+
+
+class LocalCache:
+    """Thread-safe in-process TTL cache (the L1 in front of Redis). A ttl of 0 disables it."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl) if ttl > 0 else None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        if self._cache is None:
+            return None
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: str, value: Any):
+        if self._cache is None:
+            return
+        with self._lock:
+            self._cache[key] = value
@@ -0,0 +1,83 @@
+import logging
+from contextvars import ContextVar
+from typing import Optional
+from opentelemetry import trace
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_provider = None
+
+# Provider that answered the current model call when it went through RoutedLlm (failover / hedging)
+routed_provider: ContextVar[Optional[str]] = ContextVar("routed_provider", default=None)
+
+
+def setup_tracing():
+    """
+    Installs the OpenTelemetry tracer provider for this process (call once per worker,
+    after forking). TRACING_EXPORTER: "none" (spans are no-ops), "console" or "otlp"
+    (OTLP/HTTP to TRACING_OTLP_ENDPOINT, e.g. a local collector or Jaeger).
+    ADK's own spans (invocation, call_llm with token usage, execute_tool) go to the same provider.
+    """
+    global _provider
+    if settings.TRACING_EXPORTER == "none" or _provider is not None:
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    if settings.TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    elif settings.TRACING_EXPORTER == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        raise ValueError(f"Invalid TRACING_EXPORTER: {settings.TRACING_EXPORTER}")
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    logger.info(f"Tracing enabled ({settings.TRACING_EXPORTER}, sample ratio {settings.TRACING_SAMPLE_RATIO})")
+
+
+def shutdown_tracing():
+    """Flushes pending spans (call on worker shutdown)."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def set_span_attributes(attributes: dict, span=None):
+    """Sets attributes on the span (default: the current one), skipping None values."""
+    span = span or trace.get_current_span()
+    if not span.is_recording():
+        return
+    for key, value in attributes.items():
+        if value is not None:
+            span.set_attribute(key, value)
+
+
+def llm_span_annotator(model_provider: str):
+    """
+    after_model_callback for agents: adds the provider (the one that answered, when routed),
+    tenant and token usage (including cached prompt tokens) to ADK's call_llm span.
+    """
+    def annotate(callback_context, llm_response) -> Optional[object]:
+        if llm_response.partial:
+            return None
+        usage = llm_response.usage_metadata
+        set_span_attributes({
+            "llm.provider": routed_provider.get() or model_provider,
+            "app.tenant": callback_context.state.get("college"),
+            "app.subject": callback_context.state.get("subject"),
+            "gen_ai.usage.input_tokens": usage.prompt_token_count if usage else None,
+            "gen_ai.usage.output_tokens": usage.candidates_token_count if usage else None,
+            "gen_ai.usage.cached_tokens": usage.cached_content_token_count if usage else None,
+        })
+        return None
+
+    return annotate
@@ -1,4 +1,5 @@
 from app.db.base_class import Base
 from app.models.user import User
 from app.models.document import Document, Chunk
-from app.models.school import School, Syllabus, Class, Subject
\ No newline at end of file
+from app.models.school import School, Syllabus, Class, Subject
+from app.models.answer_cache import CachedAnswer
\ No newline at end of file
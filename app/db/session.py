@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.core.metrics import instrument_pool
 
 
 async_engine = create_async_engine(
@@ -33,4 +34,7 @@ SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=sync_engine
-)
\ No newline at end of file
+)
+
+instrument_pool(async_engine.sync_engine, "async")
+instrument_pool(sync_engine, "sync")
@@ -1,9 +1,38 @@
 import logging
+from typing import Optional
 from sqlalchemy import text
 from sqlalchemy.orm import Session
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+INDEX_TYPES = ("hnsw", "ivfflat")
+
+# Storage format -> (indexed expression, operator class, index name suffix).
+# Quantised formats are expression indexes over the full-precision column,
+# so only the index shrinks; the 768-d float32 vector stays on the row for re-ranking.
+# "matryoshka" indexes the stored 256-d prefix column (embedding_short).
+EMBEDDING_STORAGE_FORMATS = {
+    "full": ("embedding", "vector_cosine_ops", ""),
+    "halfvec": ("(embedding::halfvec(768))", "halfvec_cosine_ops", "_half"),
+    "binary": ("(binary_quantize(embedding)::bit(768))", "bit_hamming_ops", "_bin"),
+    "matryoshka": ("embedding_short", "vector_cosine_ops", "_short"),
+}
+
+def ann_index_name(index_type: str, storage: str) -> str:
+    return f"ix_chunks_embedding{EMBEDDING_STORAGE_FORMATS[storage][2]}_{index_type}"
+
+def ann_index_ddl(index_type: str, storage: str) -> str:
+    expression, opclass, _ = EMBEDDING_STORAGE_FORMATS[storage]
+    if index_type == "ivfflat":
+        options = f"lists = {int(settings.IVFFLAT_LISTS)}"
+    else:
+        options = "m = 16, ef_construction = 64"
+    return (
+        f"CREATE INDEX IF NOT EXISTS {ann_index_name(index_type, storage)} ON chunks "
+        f"USING {index_type} ({expression} {opclass}) WITH ({options})"
+    )
+
 def create_vector_extension(session: Session):
     """
     Ensures the pgvector extension exists in the database.
@@ -15,4 +44,66 @@ def create_vector_extension(session: Session):
     except Exception as e:
         session.rollback()
         logger.error(f"Failed to create pgvector extension. Ensure the DB user has superuser privileges. Error: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+def ensure_chunk_partition(session: Session, school_name: str):
+    """
+    Creates the chunks partition for a school if it does not exist yet.
+    Must run before inserting that school's chunks, otherwise they land in chunks_default.
+    """
+    session.execute(text("SELECT ensure_chunk_partition(:school)").bindparams(school=school_name))
+    session.commit()
+
+def vector_search_params_stmt(ef_search: Optional[int] = None, probes: Optional[int] = None):
+    """
+    Builds a single statement that sets the ANN recall/latency knobs
+    for the current transaction only (set_config(..., is_local => true)).
+    Both knobs are set; the planner only reads the one for the index it picks.
+    """
+    ef_search = ef_search or settings.HNSW_EF_SEARCH
+    if settings.EMBEDDING_STORAGE != "full":
+        # The first pass must be able to return the whole re-rank pool.
+        ef_search = max(ef_search, settings.RERANK_CANDIDATES)
+
+    params = {
+        "ef_search": str(ef_search),
+        "probes": str(probes or settings.IVFFLAT_PROBES),
+    }
+    sql = "SELECT set_config('hnsw.ef_search', :ef_search, true), set_config('ivfflat.probes', :probes, true)"
+
+    if settings.VECTOR_ITERATIVE_SCAN:
+        sql += ", set_config('hnsw.iterative_scan', :scan, true), set_config('ivfflat.iterative_scan', :scan, true)"
+        params["scan"] = settings.VECTOR_ITERATIVE_SCAN
+
+    return text(sql).bindparams(**params)
+
+def build_vector_index(session: Session, index_type: Optional[str] = None, storage: Optional[str] = None):
+    """
+    (Re)builds the ANN index selected by VECTOR_INDEX_TYPE / EMBEDDING_STORAGE and drops every other one,
+    so switching to a quantised format actually releases the full-precision index.
+    IVFFlat clusters are trained on existing rows, so run this after bulk ingestion.
+    """
+    index_type = (index_type or settings.VECTOR_INDEX_TYPE).lower()
+    storage = (storage or settings.EMBEDDING_STORAGE).lower()
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Invalid vector index type: {index_type}")
+    if storage not in EMBEDDING_STORAGE_FORMATS:
+        raise ValueError(f"Invalid embedding storage format: {storage}")
+
+    target = ann_index_name(index_type, storage)
+    try:
+        if index_type == "ivfflat":
+            session.execute(text(f"DROP INDEX IF EXISTS {target}"))
+        session.execute(text(ann_index_ddl(index_type, storage)))
+        for other_type in INDEX_TYPES:
+            for other_storage in EMBEDDING_STORAGE_FORMATS:
+                name = ann_index_name(other_type, other_storage)
+                if name != target:
+                    session.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        session.commit()
+        logger.info(f"Vector index '{target}' built on chunks.embedding.")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to build {target} vector index: {e}")
+        raise e
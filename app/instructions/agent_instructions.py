@@ -82,4 +82,13 @@ You must format your response using **MARKDOWN** and **LATEX**.
       $$
       \\int_{a}^{b} f(x) dx
       $$
-"""
\ No newline at end of file
+"""
+
+
+RETRIEVED_CONTEXT_INSTRUCTIONS = """
+### TEXTBOOK CONTEXT
+Relevant textbook excerpts are already included in the user's message inside a **[Textbook Context]** block.
+- Answer from these excerpts; treat them exactly as if you had searched the textbook yourself.
+- If the block says nothing relevant was found, treat the topic as **missing** from the textbook.
+- Never mention the block itself.
+"""
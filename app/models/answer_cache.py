@@ -0,0 +1,34 @@
+import uuid
+from sqlalchemy import Column, String, DateTime, func, Text, Integer, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import mapped_column
+from pgvector.sqlalchemy import Vector
+from app.db.base_class import Base
+
+
+class CachedAnswer(Base):
+    """
+    Semantic answer cache: first-turn question embedding -> answer, per subject and user type.
+    Rows of a subject are deleted whenever its documents are re-ingested, moved or deleted.
+    """
+    __tablename__ = "answer_cache"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    school_name = Column(String, nullable=False)
+    syllabus = Column(String, nullable=False)
+    class_name = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    user_type = Column(String, nullable=False)
+
+    question = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    embedding = mapped_column(Vector(768), nullable=False)
+
+    hit_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_hit_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_answer_cache_subject", "school_name", "syllabus", "class_name", "subject", "user_type"),
+    )
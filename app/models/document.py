@@ -1,11 +1,19 @@
 import uuid
 import enum
-from sqlalchemy import Column, String, ForeignKey, DateTime, func, Text, Integer, Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, ForeignKey, DateTime, func, Text, Integer, Index, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 from sqlalchemy.orm import relationship, mapped_column
 from pgvector.sqlalchemy import Vector
 from app.db.base_class import Base
 
+# Gemini embeddings are Matryoshka-trained: the first SHORT_EMBEDDING_DIM values are a usable embedding on their own.
+SHORT_EMBEDDING_DIM = 256
+
+# Text search configuration of Chunk.search_vector, shared by ingestion and lexical search.
+# Fixed rather than a setting: stored vectors (including the b7e3c91d4f05 backfill) must match
+# the query side, so changing it needs a migration that rebuilds search_vector.
+FTS_CONFIG = "english"
+
 class DocStatus(str, enum.Enum):
     PENDING = "PENDING"
     PROCESSING = "PROCESSING"
@@ -40,8 +48,32 @@ class Chunk(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"))
+
+    # Denormalised from Document so retrieval needs no join.
+    # school_name is the LIST partition key (one partition per school), hence part of the PK.
+    school_name = Column(String, primary_key=True)
+    syllabus = Column(String, nullable=False)
+    class_name = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+
     chunk_index = Column(Integer, nullable=False)
     text = Column(Text, nullable=False)
     embedding = mapped_column(Vector(768)) 
+    embedding_short = mapped_column(Vector(SHORT_EMBEDDING_DIM), nullable=True)
+    search_vector = Column(TSVECTOR, nullable=True)
     
-    document = relationship("Document", back_populates="chunks")
\ No newline at end of file
+    document = relationship("Document", back_populates="chunks")
+
+    __table_args__ = (
+        Index("ix_chunks_document_id", "document_id"),
+        Index("ix_chunks_tenant", "syllabus", "class_name", "subject"),
+        Index("ix_chunks_search_vector", search_vector, postgresql_using="gin"),
+        Index(
+            "ix_chunks_embedding_hnsw",
+            embedding,
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        {"postgresql_partition_by": "LIST (school_name)"},
+    )
\ No newline at end of file
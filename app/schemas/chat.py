@@ -10,9 +10,28 @@ class ChatRequest(BaseModel):
     subject: str
     user_type: Literal["student", "teacher"] = "student"
     model: Literal["gemini", "openai", "deepseek"] = "gemini"
+    mode: Optional[Literal["agent", "retrieve"]] = Field(None, description="Defaults to CHAT_MODE")
 
 class ChatResponse(BaseModel):
     answer: str
 
+class BatchChatRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, description="Independent questions, answered without session history")
+    college: str = Field(..., description="Name of the College")
+    syllabus: str
+    class_name: str
+    subject: str
+    user_type: Literal["student", "teacher"] = "teacher"
+    model: Literal["gemini", "openai", "deepseek"] = "gemini"
+
+class BatchChatItem(BaseModel):
+    index: int
+    question: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchChatResponse(BaseModel):
+    results: List[BatchChatItem]
+
 class ClearSessionRequest(BaseModel):
     chatbot_user_id: str
\ No newline at end of file
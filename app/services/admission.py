@@ -0,0 +1,189 @@
+import time
+import uuid
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+import redis
+from app.config import settings
+from app.core.redis import LazyRedis
+
+logger = logging.getLogger(__name__)
+
+# KEYS: global slots, tenant slots, tenant wait queue.
+# ARGV: now, lease expiry, token, global limit, tenant limit, wait expiry, queue size.
+# Slots are sorted-set members scored by lease expiry, so slots of crashed workers time out;
+# waiters are scored by wait expiry (the same timeout for all, so the queue is in arrival order).
+# A newcomer takes a free slot only when nobody of its tenant is waiting, otherwise it joins the
+# queue; a free slot goes to the head of the queue, so waiters are admitted first come, first served.
+# Returns 1 (admitted), 0 (queued / still waiting) or -1 (queue full).
+ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+local free = redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[4]) and redis.call('ZCARD', KEYS[2]) < tonumber(ARGV[5])
+if redis.call('ZSCORE', KEYS[3], ARGV[3]) then
+    if not free or redis.call('ZRANGE', KEYS[3], 0, 0)[1] ~= ARGV[3] then
+        return 0
+    end
+    redis.call('ZREM', KEYS[3], ARGV[3])
+else
+    local waiting = redis.call('ZCARD', KEYS[3])
+    if not free or waiting > 0 then
+        if waiting >= tonumber(ARGV[7]) then
+            return -1
+        end
+        redis.call('ZADD', KEYS[3], ARGV[6], ARGV[3])
+        return 0
+    end
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3])
+return 1
+"""
+
+
+class AdmissionRejected(Exception):
+    """No slot for the request; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, tenant: str, reason: str, retry_after: int):
+        super().__init__(f"Admission rejected for {tenant}: {reason}")
+        self.tenant = tenant
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limits shared by all workers through Redis: at most `global_limit` requests
+    in flight overall and `tenant_limit` per tenant (college).
+    A request without a free slot waits in its tenant's queue (at most `queue_size` waiters,
+    for at most `queue_timeout` seconds); when the queue is full or the wait runs out it is
+    rejected with AdmissionRejected. If Redis is unreachable, requests are admitted.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        redis_url: str,
+        global_limit: int,
+        tenant_limit: int,
+        queue_size: int,
+        queue_timeout: float,
+        lease_seconds: int,
+        retry_after: int,
+        poll_interval: float = 0.02,
+        enabled: bool = True,
+    ):
+        self.namespace = namespace
+        self.global_limit = global_limit
+        self.tenant_limit = tenant_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.lease_seconds = lease_seconds
+        self.retry_after = retry_after
+        self.poll_interval = poll_interval
+        self.enabled = enabled
+        self._redis = LazyRedis(redis_url)
+        self._acquire = None
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0}
+
+    def _client(self):
+        client = self._redis.aio()
+        if self._acquire is None:
+            self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        return client
+
+    def _keys(self, tenant: str) -> tuple[str, str, str]:
+        return (
+            f"adm:{self.namespace}:slots",
+            f"adm:{self.namespace}:slots:{tenant}",
+            f"adm:{self.namespace}:queue:{tenant}",
+        )
+
+    async def _try_acquire(self, tenant: str, token: str) -> int:
+        now = time.time()
+        return int(await self._acquire(
+            keys=list(self._keys(tenant)),
+            args=[
+                now, now + self.lease_seconds, token, self.global_limit, self.tenant_limit,
+                now + self.queue_timeout, self.queue_size
+            ]
+        ))
+
+    async def acquire(self, tenant: str) -> Optional[str]:
+        """
+        Takes a slot for the tenant, waiting in its queue (in arrival order) if needed.
+        Returns the slot token for release(), or None when admission is disabled or Redis is down.
+        """
+        if not self.enabled:
+            return None
+
+        token = uuid.uuid4().hex
+        try:
+            client = self._client()
+            result = await self._try_acquire(tenant, token)
+            if result == 1:
+                self.stats["admitted"] += 1
+                return token
+            if result < 0:
+                self.stats["rejected"] += 1
+                raise AdmissionRejected(tenant, "queue full", self.retry_after)
+
+            self.stats["queued"] += 1
+            _, _, queue_key = self._keys(tenant)
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(self.poll_interval)
+                    if await self._try_acquire(tenant, token) == 1:
+                        self.stats["admitted"] += 1
+                        return token
+            finally:
+                await client.zrem(queue_key, token)
+
+            self.stats["rejected"] += 1
+            raise AdmissionRejected(tenant, "wait timed out", self.retry_after)
+        except redis.RedisError as e:
+            logger.warning(f"Admission control unavailable ({self.namespace}), admitting request: {e}")
+            return None
+        except asyncio.CancelledError:
+            # Cancelled while a script call was in flight: Redis may have admitted the token anyway
+            await asyncio.shield(self.release(tenant, token))
+            raise
+
+    async def release(self, tenant: str, token: Optional[str]):
+        """Frees the token's slot. Idempotent: releasing a freed (or None) token is a no-op."""
+        if token is None:
+            return
+        global_key, tenant_key, _ = self._keys(tenant)
+        try:
+            async with self._client().pipeline(transaction=True) as pipe:
+                pipe.zrem(global_key, token)
+                pipe.zrem(tenant_key, token)
+                await pipe.execute()
+        except redis.RedisError as e:
+            # The slot frees itself when its lease expires
+            logger.warning(f"Admission slot release failed ({self.namespace}): {e}")
+
+    @asynccontextmanager
+    async def slot(self, tenant: str):
+        token = await self.acquire(tenant)
+        try:
+            yield
+        finally:
+            await self.release(tenant, token)
+
+
+def make_admission_controller(namespace: str) -> AdmissionController:
+    return AdmissionController(
+        namespace=namespace,
+        redis_url=settings.REDIS_URL,
+        global_limit=settings.ADMISSION_GLOBAL_LIMIT,
+        tenant_limit=settings.ADMISSION_TENANT_LIMIT,
+        queue_size=settings.ADMISSION_QUEUE_SIZE,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        lease_seconds=settings.ADMISSION_LEASE_SECONDS,
+        retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+        enabled=settings.ADMISSION_ENABLED,
+    )
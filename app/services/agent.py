@@ -1,38 +1,170 @@
+import logging
+from typing import Dict, Optional, Tuple, Iterable
 from google.adk.agents import Agent
+from google.adk.models.base_llm import BaseLlm
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.models.google_llm import Gemini
+from google.adk.runners import Runner
+from google.adk.apps import App
+from google.adk.agents.context_cache_config import ContextCacheConfig
+from google.adk.sessions import BaseSessionService
 from app.services.tools import syllabus_tool
+from app.services.session_history import inject_history_summary
+from app.services.provider_router import RoutedLlm
+from app.core.tracing import llm_span_annotator
+from app.core.metrics import start_llm_timer, llm_metrics_recorder
+from opentelemetry import trace
 from app.config import settings
-from app.instructions.agent_instructions import STUDENT_INSTRUCTIONS, TEACHER_INSTRUCTIONS
+from app.instructions.agent_instructions import STUDENT_INSTRUCTIONS, TEACHER_INSTRUCTIONS, RETRIEVED_CONTEXT_INSTRUCTIONS
 
-def get_agent(model_provider: str, user_type: str = "student") -> Agent:
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+USER_TYPES = ("student", "teacher")
+
+# "agent": the model calls search_syllabus itself (two model calls per answer)
+# "retrieve": the endpoint retrieves first and the model answers in one call, without tools
+CHAT_MODES = ("agent", "retrieve")
+
+# Provider -> settings attribute holding its API key (used to decide what to warm up)
+PROVIDER_API_KEYS = {
+    "gemini": "GEMINI_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "deepseek": "DEEPSEEK_API_KEY",
+}
+
+def get_model(model_provider: str, prompt_cache_key: Optional[str] = None) -> BaseLlm:
+    """
+    ADK model wrapper for one provider.
+    With PROMPT_CACHE_ENABLED, OpenAI gets `prompt_cache_key` (requests sharing a prompt prefix
+    land on the same cache); Gemini is cached by the runner's context cache config (AgentRegistry)
+    and DeepSeek caches prompt prefixes on its own.
+    """
+    if model_provider == "gemini":
+        return Gemini(model=settings.GEMINI_MODEL_NAME)
+
+    models_map = {
+        "openai": f"openai/{settings.OPENAI_MODEL_NAME}",
+        "deepseek": f"deepseek/{settings.DEEPSEEK_MODEL_NAME}",
+    }
+    target_model = models_map.get(model_provider)
+    if not target_model:
+        raise ValueError(f"Invalid model provider: {model_provider}")
+    if model_provider == "openai" and settings.PROMPT_CACHE_ENABLED and prompt_cache_key:
+        return LiteLlm(model=target_model, extra_body={"prompt_cache_key": prompt_cache_key})
+    return LiteLlm(model=target_model)
+
+def get_routed_model(model_provider: str, prompt_cache_key: Optional[str] = None) -> RoutedLlm:
+    """
+    The requested provider, backed by the PROVIDER_FALLBACKS providers that have an
+    API key configured (tried in that order on failure, or when hedging).
+    """
+    names = [p.strip() for p in settings.PROVIDER_FALLBACKS.split(",")]
+    fallbacks = [
+        p for p in names
+        if p != model_provider and p in PROVIDER_API_KEYS and getattr(settings, PROVIDER_API_KEYS[p], None)
+    ]
+    providers = {name: get_model(name, prompt_cache_key) for name in [model_provider, *fallbacks]}
+    return RoutedLlm(
+        model=providers[model_provider].model,
+        primary=model_provider,
+        providers=providers,
+        hedge=settings.PROVIDER_HEDGE_ENABLED
+    )
+
+def get_agent(model_provider: str, user_type: str = "student", mode: str = "agent") -> Agent:
     """
     Factory function to create an ADK Agent.
     Selects the system prompt based on 'user_type' (student/teacher).
+    In "retrieve" mode the agent has no tools and answers from the context in the message.
     """
     
-    model_wrapper = None
-    
-    if model_provider == "gemini":
-        model_wrapper = Gemini(model=settings.GEMINI_MODEL_NAME)
+    # One static prompt per user type + mode
+    prompt_cache_key = f"{settings.PROJECT_NAME}:{user_type}:{mode}"
+    if settings.PROVIDER_ROUTING_ENABLED:
+        model_wrapper = get_routed_model(model_provider, prompt_cache_key)
     else:
-        models_map = {
-            "openai": f"openai/{settings.OPENAI_MODEL_NAME}",
-            "deepseek": f"deepseek/{settings.DEEPSEEK_MODEL_NAME}",
-        }
-        target_model = models_map.get(model_provider)
-        if not target_model:
-            raise ValueError(f"Invalid model provider: {model_provider}")
-        model_wrapper = LiteLlm(model=target_model)
+        model_wrapper = get_model(model_provider, prompt_cache_key)
 
     if user_type == "teacher":
         selected_instruction = TEACHER_INSTRUCTIONS
     else:
         selected_instruction = STUDENT_INSTRUCTIONS
 
+    if mode == "retrieve":
+        selected_instruction += RETRIEVED_CONTEXT_INSTRUCTIONS
+
     return Agent(
         model=model_wrapper,
         name="academic_tutor",
-        instruction=selected_instruction,
-        tools=[syllabus_tool]
-    )
\ No newline at end of file
+        # Passed as a provider so ADK doesn't treat the LaTeX braces in the prompts
+        # (e.g. \int_{a}^{b}) as {state} placeholders
+        instruction=lambda _ctx: selected_instruction,
+        tools=[] if mode == "retrieve" else [syllabus_tool],
+        before_model_callback=[inject_history_summary, start_llm_timer],
+        after_model_callback=[llm_span_annotator(model_provider), llm_metrics_recorder(model_provider)]
+    )
+
+class AgentRegistry:
+    """
+    Holds one Agent + Runner per (model_provider, user_type, mode) for the lifetime of the worker.
+    Agents and runners carry no per-request data (filters live in session state),
+    so reusing them is safe and keeps the provider clients and their connection pools warm.
+    """
+
+    def __init__(self, session_service: BaseSessionService, app_name: str = settings.PROJECT_NAME):
+        self.session_service = session_service
+        self.app_name = app_name
+        self._runners: Dict[Tuple[str, str, str], Runner] = {}
+
+    def _build_app(self, agent: Agent) -> App:
+        """
+        With PROMPT_CACHE_ENABLED, ADK keeps the prefix of each session's Gemini requests
+        (system instruction, tools and history) in a context cache, refreshed after
+        PROMPT_CACHE_INTERVALS invocations.
+        """
+        context_cache_config = None
+        if settings.PROMPT_CACHE_ENABLED:
+            context_cache_config = ContextCacheConfig(
+                ttl_seconds=settings.PROMPT_CACHE_TTL_SECONDS,
+                min_tokens=settings.PROMPT_CACHE_MIN_TOKENS,
+                cache_intervals=settings.PROMPT_CACHE_INTERVALS
+            )
+        name = "".join(c if c.isalnum() else "_" for c in self.app_name)
+        return App(name=name, root_agent=agent, context_cache_config=context_cache_config)
+
+    def get_runner(self, model_provider: str, user_type: str = "student", mode: str = "agent") -> Runner:
+        key = (model_provider, user_type, mode)
+        runner = self._runners.get(key)
+        if runner is not None:
+            return runner
+
+        with tracer.start_as_current_span("agent.build", attributes={"llm.provider": model_provider, "agent.mode": mode}):
+            agent = get_agent(model_provider=model_provider, user_type=user_type, mode=mode)
+            runner = Runner(app=self._build_app(agent), session_service=self.session_service)
+            # App names must be identifiers; sessions stay keyed by the configured app name
+            runner.app_name = self.app_name
+        self._runners[key] = runner
+        logger.info(f"Built agent runner for {model_provider}/{user_type}/{mode}")
+        return runner
+
+    def warm_up(self, providers: Optional[Iterable[str]] = None):
+        """Builds runners up front for every provider with an API key configured."""
+        if providers is None:
+            providers = [p for p, key in PROVIDER_API_KEYS.items() if getattr(settings, key, None)]
+
+        for provider in providers:
+            for user_type in USER_TYPES:
+                try:
+                    runner = self.get_runner(provider, user_type, settings.CHAT_MODE)
+                    model = runner.agent.model
+                    models = model.providers.values() if isinstance(model, RoutedLlm) else [model]
+                    for model in models:
+                        if isinstance(model, Gemini):
+                            # Creates the genai client (and its HTTP pool) now instead of on the first chat
+                            model.api_client
+                except Exception as e:
+                    logger.warning(f"Agent warm-up failed for {provider}/{user_type}: {e}")
+
+    def clear(self):
+        self._runners.clear()
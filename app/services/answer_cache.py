@@ -0,0 +1,118 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, update, delete, and_
+from app.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.answer_cache import CachedAnswer
+
+logger = logging.getLogger(__name__)
+
+
+def _subject_filter(school_name: str, syllabus: str, class_name: str, subject: str):
+    return and_(
+        CachedAnswer.school_name == school_name,
+        CachedAnswer.syllabus == syllabus,
+        CachedAnswer.class_name == class_name,
+        CachedAnswer.subject == subject
+    )
+
+
+def _expiry_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(hours=settings.ANSWER_CACHE_TTL_HOURS)
+
+
+class AnswerCacheService:
+    """
+    Semantic cache of first-turn answers per (college, syllabus, class, subject, user_type).
+    A question is served from cache when its embedding is within ANSWER_CACHE_THRESHOLD
+    cosine similarity of a stored question.
+    """
+
+    @staticmethod
+    async def lookup(db, subject_key: tuple, user_type: str, query_vec: list[float]) -> Optional[CachedAnswer]:
+        """
+        Nearest cached question of the subject and user type, by exact cosine distance over the
+        subject's rows (B-tree index). An ANN index over all tenants would mostly return other
+        subjects' rows and miss.
+        """
+        candidates = (
+            select(CachedAnswer.id, CachedAnswer.embedding)
+            .where(
+                _subject_filter(*subject_key),
+                CachedAnswer.user_type == user_type,
+                CachedAnswer.created_at > _expiry_cutoff()
+            )
+            .cte("candidates")
+            .prefix_with("MATERIALIZED")
+        )
+        distance = candidates.c.embedding.cosine_distance(query_vec)
+        stmt = (
+            select(CachedAnswer, distance.label("distance"))
+            .join(candidates, candidates.c.id == CachedAnswer.id)
+            .order_by(distance)
+            .limit(1)
+        )
+        row = (await db.execute(stmt)).first()
+        if row is None or 1 - row.distance < settings.ANSWER_CACHE_THRESHOLD:
+            return None
+        return row.CachedAnswer
+
+    @staticmethod
+    async def record_hit(answer_id):
+        """Hit statistics, written after the response (own DB session)."""
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(CachedAnswer)
+                    .where(CachedAnswer.id == answer_id)
+                    .values(hit_count=CachedAnswer.hit_count + 1, last_hit_at=datetime.now(timezone.utc))
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Answer cache hit update failed: {e}")
+
+    @staticmethod
+    async def store(subject_key: tuple, user_type: str, question: str, query_vec: list[float], answer: str):
+        """Stores a fresh first-turn answer (own DB session) and drops the subject's expired entries."""
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    delete(CachedAnswer).where(_subject_filter(*subject_key), CachedAnswer.created_at <= _expiry_cutoff())
+                )
+                school_name, syllabus, class_name, subject = subject_key
+                db.add(CachedAnswer(
+                    school_name=school_name,
+                    syllabus=syllabus,
+                    class_name=class_name,
+                    subject=subject,
+                    user_type=user_type,
+                    question=question,
+                    answer=answer,
+                    embedding=query_vec
+                ))
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Answer cache store failed: {e}")
+
+    @staticmethod
+    def invalidate_sync(db, *subject_keys: tuple):
+        """Drops cached answers of the given subjects (sync session). Call after their documents change."""
+        try:
+            for subject_key in set(subject_keys):
+                db.execute(delete(CachedAnswer).where(_subject_filter(*subject_key)))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Answer cache invalidation failed: {e}")
+
+    @staticmethod
+    async def invalidate(db, *subject_keys: tuple):
+        """Async counterpart of invalidate_sync."""
+        try:
+            for subject_key in set(subject_keys):
+                await db.execute(delete(CachedAnswer).where(_subject_filter(*subject_key)))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Answer cache invalidation failed: {e}")
@@ -0,0 +1,141 @@
+import logging
+import threading
+from typing import Optional
+import numpy as np
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# The splitter overlaps consecutive chunks by up to 200 characters (cut at separators, so often less);
+# search a little further for safety. Shorter matches are coincidences, not overlap.
+MAX_OVERLAP_CHARS = 300
+MIN_OVERLAP_CHARS = 50
+
+_encoder = None
+_encoder_lock = threading.Lock()
+_encoder_failed = False
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens with tiktoken (CONTEXT_TOKEN_ENCODING).
+    Falls back to ~4 characters per token if the encoding cannot be loaded (e.g. no network for the BPE file).
+    """
+    global _encoder, _encoder_failed
+    if _encoder is None and not _encoder_failed:
+        with _encoder_lock:
+            if _encoder is None and not _encoder_failed:
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding(settings.CONTEXT_TOKEN_ENCODING)
+                except Exception as e:
+                    _encoder_failed = True
+                    logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+
+    if _encoder is not None:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+def strip_overlap(previous: str, current: str) -> str:
+    """
+    Removes the prefix of `current` that repeats the tail of `previous` (splitter overlap).
+    Matches shorter than MIN_OVERLAP_CHARS are left alone: `current` is returned unchanged.
+    """
+    limit = min(len(previous), len(current), MAX_OVERLAP_CHARS)
+    for size in range(limit, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(current[:size]):
+            return current[size:]
+    return current
+
+def _chunk_vector(chunk) -> Optional[np.ndarray]:
+    vector = getattr(chunk, "embedding_short", None)
+    if vector is None:
+        return None
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+def mmr_order(chunks: list, lambda_mult: float) -> list:
+    """
+    Re-orders ranked chunks with Maximal Marginal Relevance.
+    Relevance comes from the retrieval rank (works for vector, hybrid and numpy results alike);
+    redundancy is the cosine similarity of the chunks' 256-d embedding prefixes.
+    """
+    if len(chunks) <= 2 or lambda_mult >= 1:
+        return list(chunks)
+
+    n = len(chunks)
+    relevance = [1.0 - rank / n for rank in range(n)]
+    vectors = [_chunk_vector(c) for c in chunks]
+
+    selected, remaining = [], list(range(n))
+    while remaining:
+        best, best_score = None, None
+        for i in remaining:
+            redundancy = 0.0
+            if vectors[i] is not None:
+                for j in selected:
+                    if vectors[j] is not None:
+                        redundancy = max(redundancy, float(vectors[i] @ vectors[j]))
+            score = lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+        remaining.remove(best)
+
+    return [chunks[i] for i in selected]
+
+
+class ContextBuilder:
+    @staticmethod
+    def build(chunks: list, token_budget: Optional[int] = None, lambda_mult: Optional[float] = None) -> str:
+        """
+        Assembles retrieved chunks into the context string sent to the LLM:
+        1. drops duplicate chunks (same id or same text),
+        2. orders them by MMR and greedily keeps those that fit the token budget,
+        3. merges adjacent chunk_index neighbours of the same document, removing the splitter overlap.
+        Sections keep the order of their best-ranked chunk.
+        """
+        token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+        lambda_mult = settings.CONTEXT_MMR_LAMBDA if lambda_mult is None else lambda_mult
+
+        unique, seen_ids, seen_texts = [], set(), set()
+        for chunk in chunks:
+            key = " ".join(chunk.text.split())
+            if chunk.id in seen_ids or key in seen_texts:
+                continue
+            seen_ids.add(chunk.id)
+            seen_texts.add(key)
+            unique.append(chunk)
+
+        packed, used = [], 0
+        for chunk in mmr_order(unique, lambda_mult):
+            tokens = count_tokens(chunk.text)
+            if used + tokens > token_budget:
+                continue
+            packed.append(chunk)
+            used += tokens
+
+        groups = {}
+        for rank, chunk in enumerate(packed):
+            groups.setdefault(chunk.document_id, {"rank": rank, "chunks": []})["chunks"].append(chunk)
+
+        sections = []
+        for document_id, group in groups.items():
+            ordered = sorted(group["chunks"], key=lambda c: c.chunk_index)
+            runs = [[ordered[0]]]
+            for chunk in ordered[1:]:
+                if chunk.chunk_index == runs[-1][-1].chunk_index + 1:
+                    runs[-1].append(chunk)
+                else:
+                    runs.append([chunk])
+
+            for run in runs:
+                text = run[0].text
+                for previous, current in zip(run, run[1:]):
+                    remainder = strip_overlap(previous.text, current.text)
+                    # No shared overlap means the splitter cut on a separator; keep a break between the pieces.
+                    text += remainder if remainder != current.text else "\n" + remainder
+                sections.append((group["rank"], run[0].chunk_index, f"[Source: Doc {document_id}]\n{text}"))
+
+        sections.sort(key=lambda s: (s[0], s[1]))
+        return "\n\n".join(s[2] for s in sections)
@@ -0,0 +1,114 @@
+import array
+import hashlib
+import logging
+from typing import Optional
+import redis
+from app.config import settings
+from app.core.metrics import EMBEDDING_CACHE_LOOKUPS
+from app.core.redis import LazyRedis, LocalCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Case/whitespace-insensitive form of a query, used for cache keys."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for query embeddings.
+    L1: bounded in-process LRU (per gunicorn worker).
+    L2: shared Redis (the same instance Celery uses), vectors stored as packed float32.
+    Redis errors are logged and treated as misses so search keeps working without it.
+    """
+
+    def __init__(self, maxsize: int, ttl: int, redis_url: Optional[str]):
+        self.ttl = ttl
+        self._local = LocalCache(maxsize=maxsize, ttl=ttl)
+        self._redis = LazyRedis(redis_url)
+
+    @staticmethod
+    def make_key(text: str, model: str, dim: int) -> str:
+        digest = hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+        return f"emb:{model}:{dim}:{digest}"
+
+    @staticmethod
+    def _pack(vector: list[float]) -> bytes:
+        return array.array("f", vector).tobytes()
+
+    @staticmethod
+    def _unpack(raw: bytes) -> list[float]:
+        values = array.array("f")
+        values.frombytes(raw)
+        return values.tolist()
+
+    def _get_local(self, key: str) -> Optional[list[float]]:
+        vector = self._local.get(key)
+        if vector is not None:
+            EMBEDDING_CACHE_LOOKUPS.labels("local_hit").inc()
+        return vector
+
+    def get_sync(self, key: str) -> Optional[list[float]]:
+        vector = self._get_local(key)
+        if vector is not None:
+            return vector
+
+        client = self._redis.sync()
+        if client is not None:
+            try:
+                raw = client.get(key)
+                if raw:
+                    vector = self._unpack(raw)
+                    self._local.set(key, vector)
+                    EMBEDDING_CACHE_LOOKUPS.labels("redis_hit").inc()
+                    return vector
+            except redis.RedisError as e:
+                logger.warning(f"Embedding cache read failed: {e}")
+
+        EMBEDDING_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    def set_sync(self, key: str, vector: list[float]):
+        self._local.set(key, vector)
+        client = self._redis.sync()
+        if client is not None:
+            try:
+                client.set(key, self._pack(vector), ex=self.ttl)
+            except redis.RedisError as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+
+    async def get(self, key: str) -> Optional[list[float]]:
+        vector = self._get_local(key)
+        if vector is not None:
+            return vector
+
+        client = self._redis.aio()
+        if client is not None:
+            try:
+                raw = await client.get(key)
+                if raw:
+                    vector = self._unpack(raw)
+                    self._local.set(key, vector)
+                    EMBEDDING_CACHE_LOOKUPS.labels("redis_hit").inc()
+                    return vector
+            except redis.RedisError as e:
+                logger.warning(f"Embedding cache read failed: {e}")
+
+        EMBEDDING_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    async def set(self, key: str, vector: list[float]):
+        self._local.set(key, vector)
+        client = self._redis.aio()
+        if client is not None:
+            try:
+                await client.set(key, self._pack(vector), ex=self.ttl)
+            except redis.RedisError as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+
+embedding_cache = EmbeddingCache(
+    maxsize=settings.EMBEDDING_CACHE_SIZE,
+    ttl=settings.EMBEDDING_CACHE_TTL_SECONDS,
+    redis_url=settings.REDIS_URL if settings.EMBEDDING_CACHE_REDIS else None,
+)
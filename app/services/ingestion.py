@@ -1,10 +1,15 @@
 import os
 import requests
 import logging
+from sqlalchemy import func, cast
+from sqlalchemy.dialects.postgresql import REGCONFIG
 from pypdf import PdfReader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from app.services.llm_factory import LLMFactory
-from app.models.document import Chunk
+from app.models.document import Chunk, SHORT_EMBEDDING_DIM, FTS_CONFIG
+from app.db.vector_utils import ensure_chunk_partition
+from app.services.readiness import readiness_cache
+from app.services.answer_cache import AnswerCacheService
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -28,23 +33,31 @@ class IngestionService:
             raise
 
     @staticmethod
-    def extract_text(file_path: str) -> str:
+    def extract_pages(file_path: str) -> list[str]:
+        """Text of each PDF page ("" for pages without extractable text)."""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         try:
             reader = PdfReader(file_path)
-            text = []
-            for page in reader.pages:
-                extract = page.extract_text()
-                if extract:
-                    text.append(extract)
-            return "\n".join(text)
+            return [page.extract_text() or "" for page in reader.pages]
         except Exception as e:
             logger.error(f"PDF extraction failed: {e}")
             raise
 
     @staticmethod
-    def process_document(db_session, doc_obj):
+    def extract_text(file_path: str) -> str:
+        return "\n".join(text for text in IngestionService.extract_pages(file_path) if text)
+
+    @staticmethod
+    def _subject_changed(db_session, doc_obj):
+        """Refreshes the subject's readiness and drops its cached answers after a status change."""
+        key = (doc_obj.school_name, doc_obj.syllabus, doc_obj.class_name, doc_obj.subject)
+        readiness_cache.refresh_sync(db_session, key)
+        AnswerCacheService.invalidate_sync(db_session, key)
+
+    @staticmethod
+    def process_document(db_session, doc_obj) -> dict:
+        """Ingests the document; returns its page and chunk counts."""
         try:
             logger.info(f"Starting ingestion for Document {doc_obj.id}...")
             
@@ -52,6 +65,7 @@ class IngestionService:
             doc_obj.error = None 
             db_session.add(doc_obj)
             db_session.commit()
+            IngestionService._subject_changed(db_session, doc_obj)
 
             if not doc_obj.file_path and doc_obj.source_url:
                 file_name = f"{doc_obj.id}.pdf"
@@ -59,7 +73,8 @@ class IngestionService:
                 IngestionService.download_file(doc_obj.source_url, save_path)
                 doc_obj.file_path = save_path
 
-            full_text = IngestionService.extract_text(doc_obj.file_path)
+            pages = IngestionService.extract_pages(doc_obj.file_path)
+            full_text = "\n".join(text for text in pages if text)
             if not full_text.strip():
                 raise ValueError("No text extracted from document.")
 
@@ -72,6 +87,8 @@ class IngestionService:
             
             db_session.query(Chunk).filter(Chunk.document_id == doc_obj.id).delete()
             db_session.commit()
+
+            ensure_chunk_partition(db_session, doc_obj.school_name)
             
             BATCH_SIZE = 20
             total_chunks = len(chunks_text)
@@ -84,9 +101,15 @@ class IngestionService:
                 for j, text in enumerate(batch_texts):
                     chunk = Chunk(
                         document_id=doc_obj.id,
+                        school_name=doc_obj.school_name,
+                        syllabus=doc_obj.syllabus,
+                        class_name=doc_obj.class_name,
+                        subject=doc_obj.subject,
                         chunk_index=i + j,
                         text=text,
-                        embedding=embeddings[j]
+                        embedding=embeddings[j],
+                        embedding_short=embeddings[j][:SHORT_EMBEDDING_DIM],
+                        search_vector=func.to_tsvector(cast(FTS_CONFIG, REGCONFIG), text)
                     )
                     db_session.add(chunk)
                 
@@ -97,7 +120,9 @@ class IngestionService:
             doc_obj.error = None 
             db_session.add(doc_obj)
             db_session.commit()
+            IngestionService._subject_changed(db_session, doc_obj)
             logger.info(f"Ingestion for {doc_obj.id} completed successfully.")
+            return {"pages": len(pages), "chunks": total_chunks}
             
         except Exception as e:
             logger.error(f"Ingestion failed: {e}", exc_info=True)
@@ -107,4 +132,5 @@ class IngestionService:
             doc_obj.error = str(e)[:500] 
             db_session.add(doc_obj)
             db_session.commit()
+            IngestionService._subject_changed(db_session, doc_obj)
             raise
\ No newline at end of file
@@ -1,8 +1,12 @@
 import asyncio
 import threading
 from google.genai import Client, types
+from opentelemetry import trace
 from app.config import settings
+from app.core.metrics import EMBEDDING_CALLS, EMBEDDING_BATCH_SIZE
+from app.services.embedding_cache import EmbeddingCache, embedding_cache
 
+EMBEDDING_DIM = 768
 
 _client_instance = None
 _client_lock = threading.Lock()
@@ -17,17 +21,32 @@ def get_client():
                 _client_instance = Client(api_key=settings.GEMINI_API_KEY)
     return _client_instance
 
+def _cache_key(text: str) -> str:
+    return EmbeddingCache.make_key(text, settings.GEMINI_EMBEDDING_MODEL_NAME, EMBEDDING_DIM)
+
 class LLMFactory:
     @staticmethod
     def get_embedding_sync(text: str) -> list[float]:
-        """Single text embedding (Blocking)"""
+        """Single text embedding (Blocking). Served from the query embedding cache when possible."""
+        if settings.EMBEDDING_CACHE_ENABLED:
+            key = _cache_key(text)
+            cached = embedding_cache.get_sync(key)
+            if cached is not None:
+                return cached
+
         client = get_client()
+        EMBEDDING_CALLS.labels("query").inc()
+        EMBEDDING_BATCH_SIZE.labels("query").observe(1)
         result = client.models.embed_content(
             model=settings.GEMINI_EMBEDDING_MODEL_NAME,
             contents=text,
-            config=types.EmbedContentConfig(output_dimensionality=768)
+            config=types.EmbedContentConfig(output_dimensionality=EMBEDDING_DIM)
         )
-        return result.embeddings[0].values
+        vector = result.embeddings[0].values
+
+        if settings.EMBEDDING_CACHE_ENABLED:
+            embedding_cache.set_sync(key, vector)
+        return vector
 
     @staticmethod
     def get_batch_embeddings_sync(texts: list[str]) -> list[list[float]]:
@@ -36,14 +55,57 @@ class LLMFactory:
             return []
             
         client = get_client()
+        EMBEDDING_CALLS.labels("batch").inc()
+        EMBEDDING_BATCH_SIZE.labels("batch").observe(len(texts))
         result = client.models.embed_content(
             model=settings.GEMINI_EMBEDDING_MODEL_NAME,
             contents=texts,
-            config=types.EmbedContentConfig(output_dimensionality=768)
+            config=types.EmbedContentConfig(output_dimensionality=EMBEDDING_DIM)
         )
         return [e.values for e in result.embeddings] if result.embeddings else []
 
     @staticmethod
     async def get_embedding(text: str) -> list[float]:
-        """Async wrapper for the sync method"""
-        return await asyncio.to_thread(LLMFactory.get_embedding_sync, text)
\ No newline at end of file
+        """Single text embedding (Non-blocking, uses the client's aio transport). Cached like get_embedding_sync."""
+        if settings.EMBEDDING_CACHE_ENABLED:
+            key = _cache_key(text)
+            cached = await embedding_cache.get(key)
+            trace.get_current_span().set_attribute("embedding.cache_hit", cached is not None)
+            if cached is not None:
+                return cached
+
+        client = get_client()
+        EMBEDDING_CALLS.labels("query").inc()
+        EMBEDDING_BATCH_SIZE.labels("query").observe(1)
+        result = await client.aio.models.embed_content(
+            model=settings.GEMINI_EMBEDDING_MODEL_NAME,
+            contents=text,
+            config=types.EmbedContentConfig(output_dimensionality=EMBEDDING_DIM)
+        )
+        vector = result.embeddings[0].values
+
+        if settings.EMBEDDING_CACHE_ENABLED:
+            await embedding_cache.set(key, vector)
+        return vector
+
+    @staticmethod
+    async def get_query_embeddings(texts: list[str]) -> list[list[float]]:
+        """
+        Embeddings for many queries (Non-blocking): cache hits are reused and all misses
+        are embedded with a single get_batch_embeddings_sync call in a worker thread.
+        """
+        vectors = [None] * len(texts)
+        keys = [_cache_key(text) for text in texts]
+
+        if settings.EMBEDDING_CACHE_ENABLED:
+            for i, key in enumerate(keys):
+                vectors[i] = await embedding_cache.get(key)
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embedded = await asyncio.to_thread(LLMFactory.get_batch_embeddings_sync, [texts[i] for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+                if settings.EMBEDDING_CACHE_ENABLED:
+                    await embedding_cache.set(keys[i], vector)
+        return vectors
@@ -0,0 +1,194 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncGenerator, Optional
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from app.config import settings
+from app.core.tracing import set_span_attributes, routed_provider
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """
+    Rolling per-worker samples of one provider: latency to the first response
+    and the outcome of the last PROVIDER_STATS_WINDOW calls.
+    """
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.last_failure = 0.0
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+
+    def record_failure(self):
+        self.outcomes.append(False)
+        self.last_failure = time.monotonic()
+
+    def p95(self) -> Optional[float]:
+        """p95 first-response latency in seconds (None until PROVIDER_STATS_MIN_SAMPLES calls succeeded)."""
+        if len(self.latencies) < settings.PROVIDER_STATS_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def unhealthy(self) -> bool:
+        """
+        Too many recent errors. Lasts PROVIDER_UNHEALTHY_COOLDOWN_SECONDS after the last failure,
+        then the provider gets traffic again (and is demoted again at its next failure).
+        """
+        return (
+            len(self.outcomes) >= settings.PROVIDER_STATS_MIN_SAMPLES
+            and self.error_rate() > settings.PROVIDER_MAX_ERROR_RATE
+            and time.monotonic() - self.last_failure < settings.PROVIDER_UNHEALTHY_COOLDOWN_SECONDS
+        )
+
+
+# (provider, streaming) -> stats; streamed and blocking calls have very different first-response times
+_provider_stats: dict[tuple[str, bool], ProviderStats] = {}
+
+
+def provider_stats(provider: str, stream: bool) -> ProviderStats:
+    stats = _provider_stats.get((provider, stream))
+    if stats is None:
+        stats = _provider_stats[(provider, stream)] = ProviderStats(settings.PROVIDER_STATS_WINDOW)
+    return stats
+
+
+def hedge_delay(provider: str, stream: bool) -> float:
+    """Seconds to wait for a provider's first response before hedging to the next one."""
+    p95 = provider_stats(provider, stream).p95()
+    if p95 is None:
+        return settings.PROVIDER_HEDGE_DEFAULT_DELAY_MS / 1000
+    return max(p95, settings.PROVIDER_HEDGE_MIN_DELAY_MS / 1000)
+
+
+class RoutedLlm(BaseLlm):
+    """
+    Model that sends each request down a chain of provider models (primary first).
+
+    - A provider that fails before its first response is recorded and the next one is
+      tried (failover). Errors after the first response are raised: the caller may already
+      have seen partial output.
+    - With `hedge`, a second provider is also started when the first has not answered
+      within its rolling p95 latency; whichever answers first is used, the other is cancelled.
+    - Providers whose rolling error rate exceeds PROVIDER_MAX_ERROR_RATE move to the end
+      of the chain for a cooldown.
+
+    The model field is only used for logging; each provider gets a copy of the request
+    with its own model name.
+    """
+
+    primary: str
+    providers: dict[str, BaseLlm]
+    hedge: bool = False
+
+    def route(self, stream: bool) -> list[str]:
+        order = [self.primary] + [name for name in self.providers if name != self.primary]
+        healthy = [name for name in order if not provider_stats(name, stream).unhealthy()]
+        return healthy + [name for name in order if name not in healthy]
+
+    def _start(self, name: str, llm_request: LlmRequest, stream: bool):
+        provider = self.providers[name]
+        # Providers adjust config / contents in place; don't let a hedged twin see that
+        request = llm_request.model_copy(update={
+            "model": provider.model,
+            "contents": list(llm_request.contents),
+            "config": llm_request.config.model_copy(deep=True) if llm_request.config else None,
+        })
+        responses = provider.generate_content_async(request, stream=stream)
+        return asyncio.ensure_future(responses.__anext__()), responses
+
+    @staticmethod
+    async def _discard(task: asyncio.Future, responses):
+        task.cancel()
+        try:
+            await task
+        except BaseException:
+            pass
+        try:
+            await responses.aclose()
+        except Exception:
+            pass
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        routed_provider.set(None)
+        queue = self.route(stream)
+        running = {}  # first-response task -> (provider, response generator, start time)
+        winner = None
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            name = queue.pop(0)
+            task, responses = self._start(name, llm_request, stream)
+            running[task] = (name, responses, time.perf_counter())
+
+        try:
+            launch()
+            while running and winner is None:
+                timeout = None
+                if self.hedge and queue and len(running) == 1:
+                    (name, _, started), = running.values()
+                    timeout = max(0.0, started + hedge_delay(name, stream) - time.perf_counter())
+
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"Hedging LLM request: {name} slower than {hedge_delay(name, stream):.2f}s")
+                    set_span_attributes({"llm.hedged": True})
+                    launch()
+                    continue
+
+                for task in done:
+                    name, responses, started = running.pop(task)
+                    error = task.exception()
+                    if error is None and winner is None:
+                        provider_stats(name, stream).record_success(time.perf_counter() - started)
+                        winner = (name, responses, task.result())
+                    elif error is None:
+                        await responses.aclose()
+                    else:
+                        if isinstance(error, StopAsyncIteration):
+                            error = RuntimeError(f"{name} returned no response")
+                        provider_stats(name, stream).record_failure()
+                        logger.warning(f"LLM provider {name} failed: {error}")
+                        last_error = error
+                        await responses.aclose()
+
+                if winner is None and not running and queue:
+                    logger.warning(f"Failing over LLM request to {queue[0]}")
+                    launch()
+        finally:
+            for task, (_, responses, _) in running.items():
+                await self._discard(task, responses)
+
+        if winner is None:
+            raise last_error or RuntimeError("No LLM provider available")
+
+        name, responses, first = winner
+        # Read by the agents' after_model_callbacks to label metrics / spans with this provider
+        routed_provider.set(name)
+        set_span_attributes({
+            "llm.routed_provider": name,
+            "llm.failover": bool(last_error),
+        })
+        if name != self.primary:
+            logger.info(f"LLM request answered by {name} instead of {self.primary}")
+        yield first
+        try:
+            async for response in responses:
+                yield response
+        finally:
+            await responses.aclose()
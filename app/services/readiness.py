@@ -0,0 +1,150 @@
+import hashlib
+import logging
+from typing import Optional
+import redis
+from opentelemetry import trace
+from sqlalchemy import select, and_, case
+from app.config import settings
+from app.core.redis import LazyRedis, LocalCache
+from app.models.document import Document, DocStatus
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# Cached value for a subject that has no documents at all
+MISSING = "MISSING"
+
+
+def readiness_stmt(school_name: str, syllabus: str, class_name: str, subject: str):
+    """
+    Single query for a subject's readiness: COMPLETED if any document is,
+    otherwise the status of one of its documents (no row -> no documents).
+    """
+    return select(Document.status).where(
+        and_(
+            Document.school_name == school_name,
+            Document.syllabus == syllabus,
+            Document.class_name == class_name,
+            Document.subject == subject
+        )
+    ).order_by(
+        case((Document.status == DocStatus.COMPLETED, 0), else_=1)
+    ).limit(1)
+
+
+def _as_status(value) -> str:
+    if value is None:
+        return MISSING
+    return value.value if isinstance(value, DocStatus) else str(value)
+
+
+class ReadinessCache:
+    """
+    Caches the readiness status of each (college, syllabus, class, subject) so /chat
+    can skip its pre-flight queries.
+    L1: short-lived in-process cache (bounds staleness across workers).
+    L2: shared Redis, rewritten by whoever changes a document (ingestion, API, admin).
+
+    Readers only fill missing entries (SET NX) and writers always overwrite after commit,
+    so a reader racing a status change can't leave an old status behind.
+    Redis errors are logged and fall back to the database.
+    """
+
+    def __init__(self, ttl: int, local_ttl: int, redis_url: Optional[str], enabled: bool = True):
+        self.ttl = ttl
+        self.enabled = enabled
+        self._local = LocalCache(maxsize=10000, ttl=local_ttl)
+        self._redis = LazyRedis(redis_url)
+
+    @staticmethod
+    def make_key(school_name: str, syllabus: str, class_name: str, subject: str) -> str:
+        raw = "\x1f".join([school_name, syllabus, class_name, subject])
+        return f"ready:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    async def get_status(self, db, school_name: str, syllabus: str, class_name: str, subject: str) -> str:
+        """Readiness status of a subject (a DocStatus value or MISSING), from cache when possible."""
+        with tracer.start_as_current_span("readiness.get_status", attributes={"app.tenant": school_name}) as span:
+            status, source = await self._get_status(db, school_name, syllabus, class_name, subject)
+            span.set_attributes({"readiness.status": status, "readiness.source": source})
+            return status
+
+    async def _get_status(self, db, school_name: str, syllabus: str, class_name: str, subject: str) -> tuple[str, str]:
+        if not self.enabled:
+            result = await db.execute(readiness_stmt(school_name, syllabus, class_name, subject))
+            return _as_status(result.scalar()), "db"
+
+        key = self.make_key(school_name, syllabus, class_name, subject)
+        status = self._local.get(key)
+        if status is not None:
+            return status, "local"
+
+        client = self._redis.aio()
+        if client is not None:
+            try:
+                raw = await client.get(key)
+                if raw:
+                    status = raw.decode()
+                    self._local.set(key, status)
+                    return status, "redis"
+            except redis.RedisError as e:
+                logger.warning(f"Readiness cache read failed: {e}")
+
+        result = await db.execute(readiness_stmt(school_name, syllabus, class_name, subject))
+        status = _as_status(result.scalar())
+        self._local.set(key, status)
+
+        if client is not None:
+            try:
+                await client.set(key, status, ex=self.ttl, nx=True)
+            except redis.RedisError as e:
+                logger.warning(f"Readiness cache write failed: {e}")
+        return status, "db"
+
+    def refresh_sync(self, db, *subject_keys: tuple):
+        """
+        Recomputes and stores the status of the given subjects (sync session).
+        Call after committing a status change, delete or move of a document.
+        """
+        if not self.enabled:
+            return
+        client = self._redis.sync()
+        for subject_key in set(subject_keys):
+            key = self.make_key(*subject_key)
+            try:
+                status = _as_status(db.execute(readiness_stmt(*subject_key)).scalar())
+            except Exception as e:
+                logger.warning(f"Readiness refresh failed for {'/'.join(subject_key)}: {e}")
+                continue
+            self._local.set(key, status)
+            if client is not None:
+                try:
+                    client.set(key, status, ex=self.ttl)
+                except redis.RedisError as e:
+                    logger.warning(f"Readiness cache write failed: {e}")
+
+    async def refresh(self, db, *subject_keys: tuple):
+        """Async counterpart of refresh_sync."""
+        if not self.enabled:
+            return
+        client = self._redis.aio()
+        for subject_key in set(subject_keys):
+            key = self.make_key(*subject_key)
+            try:
+                status = _as_status((await db.execute(readiness_stmt(*subject_key))).scalar())
+            except Exception as e:
+                logger.warning(f"Readiness refresh failed for {'/'.join(subject_key)}: {e}")
+                continue
+            self._local.set(key, status)
+            if client is not None:
+                try:
+                    await client.set(key, status, ex=self.ttl)
+                except redis.RedisError as e:
+                    logger.warning(f"Readiness cache write failed: {e}")
+
+
+readiness_cache = ReadinessCache(
+    ttl=settings.READINESS_CACHE_TTL_SECONDS,
+    local_ttl=settings.READINESS_CACHE_LOCAL_TTL_SECONDS,
+    redis_url=settings.REDIS_URL,
+    enabled=settings.READINESS_CACHE_ENABLED,
+)
@@ -0,0 +1,205 @@
+import time
+import asyncio
+import logging
+from typing import Optional
+from sqlalchemy import select, func, cast, and_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
+from sqlalchemy.orm import defer
+from opentelemetry import trace
+from app.db.session import AsyncSessionLocal
+from app.db.vector_utils import vector_search_params_stmt
+from app.models.document import Chunk, SHORT_EMBEDDING_DIM, FTS_CONFIG
+from app.services.llm_factory import LLMFactory
+from app.services.vector_store import NumpyVectorIndex
+from app.config import settings
+from app.core.metrics import RETRIEVAL_LATENCY, RETRIEVAL_RESULTS
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+SEARCH_MODES = ("vector", "hybrid", "numpy")
+
+
+def build_filter_conditions(filters: dict) -> list:
+    conditions = []
+    if filters.get('school_name'): 
+        conditions.append(Chunk.school_name == filters['school_name'])
+    if filters.get('syllabus'): 
+        conditions.append(Chunk.syllabus == filters['syllabus'])
+    if filters.get('class_name'): 
+        conditions.append(Chunk.class_name == filters['class_name'])
+    if filters.get('subject'): 
+        conditions.append(Chunk.subject == filters['subject'])
+    return conditions
+
+def _base_stmt(filters: dict):
+    stmt = select(Chunk).options(defer(Chunk.embedding), defer(Chunk.search_vector))
+    conditions = build_filter_conditions(filters)
+    if conditions:
+        stmt = stmt.where(*conditions)
+    return stmt
+
+def first_pass_distance(query_vec: list[float], storage: str):
+    """Distance expression matching the quantised expression index for the storage format."""
+    if storage == "halfvec":
+        return cast(Chunk.embedding, HALFVEC(768)).cosine_distance(cast(query_vec, HALFVEC(768)))
+    if storage == "binary":
+        return cast(func.binary_quantize(Chunk.embedding), BIT(768)).hamming_distance(
+            cast(func.binary_quantize(cast(query_vec, Vector(768))), BIT(768))
+        )
+    if storage == "matryoshka":
+        # Cosine distance ignores scale, so the raw prefix needs no re-normalisation.
+        return Chunk.embedding_short.cosine_distance(query_vec[:SHORT_EMBEDDING_DIM])
+    raise ValueError(f"Invalid embedding storage format: {storage}")
+
+def vector_search_stmt(query_vec: list[float], filters: dict, limit: int):
+    """
+    Nearest chunks by cosine distance.
+    With quantised or matryoshka storage, RERANK_CANDIDATES rows are shortlisted on the small
+    halfvec/binary/256-d index and only those are re-ranked with the full 768-d vector.
+    """
+    storage = settings.EMBEDDING_STORAGE
+    if storage == "full":
+        return _base_stmt(filters).order_by(Chunk.embedding.cosine_distance(query_vec)).limit(limit)
+
+    shortlist = select(Chunk.id, Chunk.school_name)
+    conditions = build_filter_conditions(filters)
+    if conditions:
+        shortlist = shortlist.where(*conditions)
+    shortlist = (
+        shortlist.order_by(first_pass_distance(query_vec, storage))
+        .limit(max(settings.RERANK_CANDIDATES, limit))
+        .subquery("shortlist")
+    )
+
+    return (
+        _base_stmt(filters)
+        .join(shortlist, and_(Chunk.id == shortlist.c.id, Chunk.school_name == shortlist.c.school_name))
+        .order_by(Chunk.embedding.cosine_distance(query_vec))
+        .limit(limit)
+    )
+
+def lexical_search_stmt(query: str, filters: dict, limit: int):
+    """Full-text candidates from the GIN-indexed search_vector column, best ts_rank_cd first."""
+    ts_query = func.websearch_to_tsquery(cast(FTS_CONFIG, REGCONFIG), query)
+    return (
+        _base_stmt(filters)
+        .where(Chunk.search_vector.op("@@")(ts_query))
+        .order_by(func.ts_rank_cd(Chunk.search_vector, ts_query).desc())
+        .limit(limit)
+    )
+
+def reciprocal_rank_fusion(ranked_lists: list[list[Chunk]], limit: int, k: Optional[int] = None) -> list[Chunk]:
+    """
+    Merges several ranked candidate lists with RRF: score(d) = sum(1 / (k + rank_d)).
+    Rank-based, so lexical and cosine scores never need to be normalised against each other.
+    """
+    k = k or settings.RRF_K
+    scores, by_id = {}, {}
+    for ranked in ranked_lists:
+        for rank, chunk in enumerate(ranked, start=1):
+            scores[chunk.id] = scores.get(chunk.id, 0.0) + 1.0 / (k + rank)
+            by_id.setdefault(chunk.id, chunk)
+
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [by_id[chunk_id] for chunk_id in ordered[:limit]]
+
+
+class RetrievalService:
+    @staticmethod
+    def _resolve_mode(mode: Optional[str]) -> str:
+        mode = mode or settings.SEARCH_MODE
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Invalid search mode: {mode}")
+        return mode
+
+    @staticmethod
+    async def _vector_candidates(
+        query: str, filters: dict, limit: int, use_numpy: bool = False, query_vec: Optional[list[float]] = None
+    ) -> list:
+        """
+        Embeds the query (unless query_vec is given) and returns its nearest chunks.
+        In numpy mode the subject's mmap index answers without touching Postgres;
+        subjects that have not been exported yet fall back to pgvector.
+        """
+        if query_vec is None:
+            with tracer.start_as_current_span("retrieval.embed"):
+                query_vec = await LLMFactory.get_embedding(query)
+
+        with tracer.start_as_current_span("retrieval.vector_query", attributes={"retrieval.limit": limit}) as span:
+            if use_numpy:
+                hits = NumpyVectorIndex.search(filters, query_vec, limit)
+                if hits is not None:
+                    span.set_attributes({"retrieval.backend": "numpy", "retrieval.chunks": len(hits)})
+                    return hits
+
+            async with AsyncSessionLocal() as db:
+                await db.execute(vector_search_params_stmt())
+                result = await db.execute(vector_search_stmt(query_vec, filters, limit))
+                chunks = list(result.scalars().all())
+            span.set_attributes({"retrieval.backend": "pgvector", "retrieval.chunks": len(chunks)})
+            return chunks
+
+    @staticmethod
+    async def _lexical_candidates(query: str, filters: dict, limit: int) -> list[Chunk]:
+        with tracer.start_as_current_span("retrieval.lexical_query", attributes={"retrieval.limit": limit}) as span:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(lexical_search_stmt(query, filters, limit))
+                chunks = list(result.scalars().all())
+            span.set_attribute("retrieval.chunks", len(chunks))
+            return chunks
+
+    @staticmethod
+    async def search(
+        query: str, filters: dict, mode: Optional[str] = None, query_vec: Optional[list[float]] = None
+    ) -> list:
+        """
+        Returns the most relevant chunks for a query (Non-blocking).
+        In hybrid mode the lexical query runs on its own connection while the
+        query is being embedded and vector-searched, then both lists are fused.
+        Pass query_vec when the query was already embedded (e.g. in a batch).
+        """
+        mode = RetrievalService._resolve_mode(mode)
+        limit = settings.SEARCH_LIMIT
+        trace.get_current_span().set_attribute("retrieval.mode", mode)
+        started = time.perf_counter()
+
+        if mode != "hybrid":
+            results = await RetrievalService._vector_candidates(
+                query, filters, limit, use_numpy=(mode == "numpy"), query_vec=query_vec
+            )
+        else:
+            lexical, vector = await asyncio.gather(
+                RetrievalService._lexical_candidates(query, filters, settings.HYBRID_LEXICAL_CANDIDATES),
+                RetrievalService._vector_candidates(query, filters, settings.HYBRID_VECTOR_CANDIDATES, query_vec=query_vec),
+            )
+            results = reciprocal_rank_fusion([lexical, vector], limit)
+
+        RETRIEVAL_LATENCY.labels(mode).observe(time.perf_counter() - started)
+        RETRIEVAL_RESULTS.labels(mode).observe(len(results))
+        return results
+
+    @staticmethod
+    def search_batch(filters: dict, query_vecs: list[list[float]], mode: Optional[str] = None) -> Optional[list[list]]:
+        """
+        Nearest chunks for several already-embedded queries on one subject.
+        Only numpy mode answers a batch at once (one matrix product); returns None in other
+        modes or when the subject has no export, and the caller searches query by query.
+        """
+        mode = RetrievalService._resolve_mode(mode)
+        if mode != "numpy":
+            return None
+
+        started = time.perf_counter()
+        with tracer.start_as_current_span("retrieval.vector_query", attributes={"retrieval.queries": len(query_vecs)}) as span:
+            results = NumpyVectorIndex.search_batch(filters, query_vecs, settings.SEARCH_LIMIT)
+            if results is None:
+                return None
+            span.set_attribute("retrieval.backend", "numpy")
+
+        elapsed = time.perf_counter() - started
+        for hits in results:
+            RETRIEVAL_LATENCY.labels(mode).observe(elapsed)
+            RETRIEVAL_RESULTS.labels(mode).observe(len(hits))
+        return results
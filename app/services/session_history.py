@@ -0,0 +1,222 @@
+import logging
+from typing import Optional
+from google.adk.events import Event, EventActions
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.session import Session
+from google.genai import types
+from app.config import settings
+from app.services.llm_factory import get_client
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+HISTORY_SUMMARY_KEY = "history_summary"
+HISTORY_SUMMARY_UNTIL_KEY = "history_summary_until"
+
+# Tools whose calls/results are never replayed to the model on later turns
+DROPPED_TOOLS = {"search_syllabus"}
+
+# Marks the retrieved-context part of a user message ("retrieve" chat mode); not replayed either
+CONTEXT_MARKER = "[Textbook Context]"
+
+# Upper bound of stored events per turn (user, tool call, tool result, answer + slack);
+# only used to bound the DB read, the window itself is cut on turn boundaries.
+EVENTS_PER_TURN = 8
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a tutoring conversation between a student and an "
+    "AI tutor. Update the summary with the new turns below. Keep the topics covered, the "
+    "student's questions, misunderstandings and any preferences they stated. "
+    "Be concise (at most 200 words) and write plain prose."
+)
+
+
+def max_window_turns() -> int:
+    """Turns replayed verbatim: the recent window plus turns waiting for the next compaction."""
+    return settings.HISTORY_RECENT_TURNS + settings.HISTORY_COMPACT_BATCH
+
+
+def split_turns(events: list[Event]) -> list[list[Event]]:
+    """Groups events into turns, each starting at a user message. Leading partial turns are dropped."""
+    turns = []
+    for event in events:
+        if event.author == "user" and event.content:
+            turns.append([event])
+        elif turns:
+            turns[-1].append(event)
+    return turns
+
+
+def strip_tool_parts(event: Event) -> Optional[Event]:
+    """
+    Copy of the event without calls/results of DROPPED_TOOLS or retrieved-context parts
+    (None if nothing is left).
+    """
+    if not event.content or not event.content.parts:
+        return event
+
+    def dropped(part: types.Part) -> bool:
+        if part.text and part.text.startswith(CONTEXT_MARKER):
+            return True
+        call = part.function_call or part.function_response
+        return call is not None and call.name in DROPPED_TOOLS
+
+    parts = [p for p in event.content.parts if not dropped(p)]
+    if len(parts) == len(event.content.parts):
+        return event
+    if not parts:
+        return None
+    return event.model_copy(update={"content": event.content.model_copy(update={"parts": parts})})
+
+
+def window_events(events: list[Event], summary_until: Optional[float]) -> list[Event]:
+    """
+    History replayed to the model: whole turns newer than the stored summary,
+    capped at max_window_turns(), with search tool payloads removed.
+    """
+    if summary_until:
+        events = [e for e in events if e.timestamp > summary_until]
+
+    turns = split_turns(events)[-max_window_turns():]
+    windowed = []
+    for turn in turns:
+        for event in turn:
+            event = strip_tool_parts(event)
+            if event is not None:
+                windowed.append(event)
+    return windowed
+
+
+def turn_transcript(turn: list[Event]) -> str:
+    """Plain-text form of a turn for the summariser (question and final answer only)."""
+    lines = []
+    for event in turn:
+        if not event.content or not event.content.parts:
+            continue
+        text = "".join(p.text for p in event.content.parts if p.text and not p.thought).strip()
+        if not text:
+            continue
+        if event.author == "user":
+            # Drop the [System Context] header added by the chat endpoint
+            text = text.split("User Question:", 1)[-1].strip()
+            lines.append(f"Student: {text}")
+        elif event.is_final_response():
+            lines.append(f"Tutor: {text}")
+    return "\n".join(lines)
+
+
+class WindowedSessionService(DatabaseSessionService):
+    """
+    DatabaseSessionService that loads a bounded slice of a session's history.
+    Plain get_session calls (as made by Runner) read at most max_window_turns() turns
+    from the database, so per-turn cost stays flat however old the session is.
+    Older turns live on only as the summary kept in session state.
+    """
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        with tracer.start_as_current_span("session.load", attributes={"session.store": "database"}) as span:
+            if config is not None or not settings.HISTORY_WINDOW_ENABLED:
+                return await super().get_session(
+                    app_name=app_name, user_id=user_id, session_id=session_id, config=config
+                )
+
+            session = await super().get_session(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                config=GetSessionConfig(num_recent_events=max_window_turns() * EVENTS_PER_TURN),
+            )
+            if session is not None:
+                session.events = window_events(session.events, session.state.get(HISTORY_SUMMARY_UNTIL_KEY))
+                span.set_attribute("session.events", len(session.events))
+            return session
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return await super().append_event(session=session, event=event)
+        with tracer.start_as_current_span("session.save", attributes={"session.store": "database"}):
+            return await super().append_event(session=session, event=event)
+
+
+def is_first_turn(session: Session) -> bool:
+    """True when the session has no earlier conversation (verbatim or summarised)."""
+    return not split_turns(session.events) and not session.state.get(HISTORY_SUMMARY_KEY)
+
+
+def needs_compaction(session: Session) -> bool:
+    """True once the next turn will push the unsummarised history past the window."""
+    if not settings.HISTORY_WINDOW_ENABLED:
+        return False
+    return len(split_turns(session.events)) + 1 >= max_window_turns()
+
+
+async def summarize_turns(previous_summary: Optional[str], turns: list[list[Event]]) -> str:
+    transcript = "\n\n".join(t for t in (turn_transcript(turn) for turn in turns) if t)
+    prompt = f"{SUMMARY_PROMPT}\n\nCurrent summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"
+
+    response = await get_client().aio.models.generate_content(
+        model=settings.HISTORY_SUMMARY_MODEL or settings.GEMINI_MODEL_NAME,
+        contents=prompt,
+    )
+    return (response.text or "").strip()
+
+
+async def compact_session_history(session_service, app_name: str, user_id: str, session_id: str):
+    """
+    Background task: folds all but the last HISTORY_RECENT_TURNS turns into the stored summary.
+    Failures are logged only; the window keeps the next turn bounded either way.
+    """
+    try:
+        session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        if session is None:
+            return
+
+        turns = split_turns(session.events)
+        if len(turns) < max_window_turns():
+            return
+
+        old_turns = turns[:-settings.HISTORY_RECENT_TURNS] if settings.HISTORY_RECENT_TURNS else turns
+        summary = await summarize_turns(session.state.get(HISTORY_SUMMARY_KEY), old_turns)
+        if not summary:
+            return
+
+        await session_service.append_event(
+            session=session,
+            # State-only event; authored by "user" like ADK's own state_delta events,
+            # so the runner doesn't treat it as a reply from an unknown agent
+            event=Event(
+                author="user",
+                invocation_id=Event.new_id(),
+                actions=EventActions(state_delta={
+                    HISTORY_SUMMARY_KEY: summary,
+                    HISTORY_SUMMARY_UNTIL_KEY: old_turns[-1][-1].timestamp,
+                })
+            )
+        )
+        logger.info(f"Compacted {len(old_turns)} turns of session {session_id}")
+    except Exception as e:
+        logger.warning(f"History compaction failed for session {session_id}: {e}")
+
+
+def inject_history_summary(callback_context, llm_request):
+    """
+    before_model_callback: gives the model the summary of turns outside the window.
+    It goes in front of the history rather than into the system instruction, which stays
+    identical across sessions so providers can serve it from their prompt caches.
+    """
+    summary = callback_context.state.get(HISTORY_SUMMARY_KEY)
+    if summary:
+        llm_request.contents.insert(0, types.Content(
+            role="user",
+            parts=[types.Part(text=f"### EARLIER CONVERSATION (SUMMARY)\n{summary}")]
+        ))
+    return None
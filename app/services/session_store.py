@@ -0,0 +1,283 @@
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Optional
+import redis
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from app.config import settings
+from app.core.redis import LazyRedis
+from app.services.session_history import window_events, HISTORY_SUMMARY_UNTIL_KEY
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+DIRTY_SET_KEY = "adk:sessions:dirty"
+
+
+class RedisSessionService(BaseSessionService):
+    """
+    Session service that serves active sessions from Redis and persists them to Postgres
+    with write-behind.
+
+    - Every session is one JSON document in Redis (its recent history window + state),
+      expiring after SESSION_IDLE_TTL_SECONDS without use. A miss falls back to the
+      durable service, and the result is cached again.
+    - Writes update Redis and queue the change on a per-session pending list. A flusher
+      task drains the lists into the durable service in batches, holding a short
+      per-session lock so changes reach Postgres in order even with several workers.
+    - If Redis is unreachable, calls go straight to the durable service.
+
+    Concurrent turns on the same session are last-writer-wins in Redis (like ADK's
+    InMemorySessionService); every event still reaches Postgres through the queue.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        durable: BaseSessionService,
+        idle_ttl: int = 3600,
+        flush_interval: float = 0.5,
+        flush_batch: int = 100,
+    ):
+        self.durable = durable
+        self.idle_ttl = idle_ttl
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._redis = LazyRedis(redis_url, timeout=0.5)
+        self._flusher: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _session_key(app_name: str, user_id: str, session_id: str) -> str:
+        return f"adk:session:{app_name}:{user_id}:{session_id}"
+
+    @staticmethod
+    def _pending_key(app_name: str, user_id: str, session_id: str) -> str:
+        return f"adk:pending:{app_name}:{user_id}:{session_id}"
+
+    @staticmethod
+    def _lock_key(app_name: str, user_id: str, session_id: str) -> str:
+        return f"adk:flushlock:{app_name}:{user_id}:{session_id}"
+
+    def _snapshot(self, session: Session) -> str:
+        """JSON stored in Redis: the session with only the history window that will be replayed."""
+        events = session.events
+        if settings.HISTORY_WINDOW_ENABLED:
+            events = window_events(events, session.state.get(HISTORY_SUMMARY_UNTIL_KEY))
+        return session.model_copy(update={"events": events}).model_dump_json()
+
+    @staticmethod
+    def _apply_config(session: Session, config: Optional[GetSessionConfig]) -> Session:
+        if config is None:
+            return session
+        events = session.events
+        if config.after_timestamp:
+            events = [e for e in events if e.timestamp >= config.after_timestamp]
+        if config.num_recent_events:
+            events = events[-config.num_recent_events:]
+        session.events = events
+        return session
+
+    def _enqueue(self, pipe, app_name: str, user_id: str, session_id: str, op: dict):
+        pipe.rpush(self._pending_key(app_name, user_id, session_id), json.dumps(op))
+        pipe.sadd(DIRTY_SET_KEY, json.dumps([app_name, user_id, session_id]))
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = Session(
+            id=session_id or str(uuid.uuid4()),
+            app_name=app_name,
+            user_id=user_id,
+            state=dict(state or {}),
+            events=[],
+            last_update_time=time.time(),
+        )
+        try:
+            client = self._redis.aio()
+            created = await client.set(
+                self._session_key(app_name, user_id, session.id), self._snapshot(session), ex=self.idle_ttl, nx=True
+            )
+            if not created:
+                raise AlreadyExistsError(f"Session with id {session.id} already exists.")
+            async with client.pipeline(transaction=True) as pipe:
+                self._enqueue(pipe, app_name, user_id, session.id, {"op": "create", "state": session.state})
+                await pipe.execute()
+            return session
+        except redis.RedisError as e:
+            logger.warning(f"Session store unavailable, creating session in database: {e}")
+            return await self.durable.create_session(
+                app_name=app_name, user_id=user_id, state=state, session_id=session_id
+            )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = self._session_key(app_name, user_id, session_id)
+        try:
+            client = self._redis.aio()
+            with tracer.start_as_current_span("session.load", attributes={"session.store": "redis"}) as span:
+                raw = await client.getex(key, ex=self.idle_ttl)
+                span.set_attribute("session.cache_hit", bool(raw))
+            if raw:
+                return self._apply_config(Session.model_validate_json(raw), config)
+        except redis.RedisError as e:
+            logger.warning(f"Session store read failed: {e}")
+            return await self.durable.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id, config=config
+            )
+
+        session = await self.durable.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        if session is None:
+            return None
+
+        try:
+            await client.set(key, self._snapshot(session), ex=self.idle_ttl, nx=True)
+        except redis.RedisError as e:
+            logger.warning(f"Session store write failed: {e}")
+        return self._apply_config(session, config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        """Served by the durable store (sessions not flushed yet are not listed)."""
+        return await self.durable.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        """Deletes synchronously everywhere so a following get_session can't resurrect the session."""
+        try:
+            await self._redis.aio().delete(
+                self._session_key(app_name, user_id, session_id),
+                self._pending_key(app_name, user_id, session_id),
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Session store delete failed: {e}")
+
+        await self.durable.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        event = await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        try:
+            with tracer.start_as_current_span("session.save", attributes={"session.store": "redis"}):
+                async with self._redis.aio().pipeline(transaction=True) as pipe:
+                    pipe.set(
+                        self._session_key(session.app_name, session.user_id, session.id),
+                        self._snapshot(session),
+                        ex=self.idle_ttl
+                    )
+                    self._enqueue(
+                        pipe, session.app_name, session.user_id, session.id,
+                        {"op": "append", "event": event.model_dump_json()}
+                    )
+                    await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Session store write failed, writing event through to database: {e}")
+            await self._apply_ops(session.app_name, session.user_id, session.id, [{"op": "append", "event": event.model_dump_json()}])
+        return event
+
+    async def _apply_ops(self, app_name: str, user_id: str, session_id: str, ops: list[dict]) -> int:
+        """
+        Applies queued changes to the durable store in order.
+        Returns how many were applied; stops at the first failure so nothing is written twice.
+        """
+        applied = 0
+        try:
+            durable_session = await self.durable.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id,
+                config=GetSessionConfig(num_recent_events=1)
+            )
+            for op in ops:
+                if op["op"] == "create":
+                    if durable_session is None:
+                        durable_session = await self.durable.create_session(
+                            app_name=app_name, user_id=user_id, state=op.get("state"), session_id=session_id
+                        )
+                elif op["op"] == "append":
+                    if durable_session is None:
+                        logger.warning(f"Dropping event for unknown session {session_id}")
+                    else:
+                        await self.durable.append_event(durable_session, Event.model_validate_json(op["event"]))
+                applied += 1
+        except Exception as e:
+            logger.error(f"Session write-behind failed for {session_id} after {applied}/{len(ops)} changes: {e}")
+        return applied
+
+    async def flush_once(self) -> int:
+        """Drains up to flush_batch dirty sessions into the durable store. Returns the number of ops written."""
+        client = self._redis.aio()
+        members = await client.spop(DIRTY_SET_KEY, self.flush_batch)
+        written = 0
+
+        for member in members or []:
+            app_name, user_id, session_id = json.loads(member)
+            pending_key = self._pending_key(app_name, user_id, session_id)
+            lock_key = self._lock_key(app_name, user_id, session_id)
+
+            if not await client.set(lock_key, "1", nx=True, ex=30):
+                # Another worker is flushing this session; look at it again next round
+                await client.sadd(DIRTY_SET_KEY, member)
+                continue
+
+            try:
+                raw_ops = await client.lrange(pending_key, 0, self.flush_batch - 1)
+                ops = [json.loads(raw) for raw in raw_ops]
+                applied = await self._apply_ops(app_name, user_id, session_id, ops)
+                if applied:
+                    await client.ltrim(pending_key, applied, -1)
+                written += applied
+
+                if await client.llen(pending_key):
+                    await client.sadd(DIRTY_SET_KEY, member)
+            finally:
+                await client.delete(lock_key)
+
+        return written
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                if not await self.flush_once():
+                    await asyncio.sleep(self.flush_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Session flusher error: {e}")
+                await asyncio.sleep(self.flush_interval * 4)
+
+    def start(self):
+        """Starts the background flusher (call from the app lifespan)."""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stops the flusher after writing everything that is still pending."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        try:
+            while await self.flush_once():
+                pass
+        except Exception as e:
+            logger.warning(f"Final session flush failed: {e}")
@@ -0,0 +1,150 @@
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Optional
+import redis
+from app.config import settings
+from app.core.redis import LazyRedis
+
+logger = logging.getLogger(__name__)
+
+
+def flight_key(*parts: Any) -> str:
+    """Stable key for a unit of work from JSON-serialisable parts."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work so it runs once.
+    Within a worker, callers with the same key await the leader's future.
+    Across workers, the leader holds a Redis lock and publishes its (JSON) result for
+    `result_ttl` seconds; followers poll for it while the lock is held.
+    Anything unexpected (Redis down, leader failed or timed out) makes the caller compute
+    on its own, so coalescing never changes results, only how often they are computed.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        redis_url: Optional[str],
+        lock_timeout: float,
+        result_ttl: int,
+        poll_interval: float = 0.02,
+        enabled: bool = True,
+    ):
+        self.namespace = namespace
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.enabled = enabled
+        self._redis = LazyRedis(redis_url)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.stats = {"leader": 0, "local_shared": 0, "redis_shared": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns fn()'s result, sharing one execution among concurrent callers with the same key."""
+        if not self.enabled:
+            return await fn()
+
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                result = await asyncio.shield(future)
+                self.stats["local_shared"] += 1
+                return result
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # The leader's request went away; don't take this one down with it
+                    return await fn()
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._do_shared(key, fn)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # followers re-raise it; don't warn when there are none
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _do_shared(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        client = self._redis.aio()
+        if client is None:
+            self.stats["leader"] += 1
+            return await fn()
+
+        lock_key = f"sf:{self.namespace}:lock:{key}"
+        result_key = f"sf:{self.namespace}:result:{key}"
+
+        try:
+            leader = await client.set(lock_key, "1", nx=True, px=int(self.lock_timeout * 1000))
+        except redis.RedisError as e:
+            logger.warning(f"Single-flight lock failed ({self.namespace}): {e}")
+            self.stats["leader"] += 1
+            return await fn()
+
+        if leader:
+            self.stats["leader"] += 1
+            try:
+                result = await fn()
+            except BaseException:
+                await self._release(client, lock_key)
+                raise
+            try:
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.set(result_key, json.dumps(result), ex=self.result_ttl)
+                    pipe.delete(lock_key)
+                    await pipe.execute()
+            except redis.RedisError as e:
+                logger.warning(f"Single-flight publish failed ({self.namespace}): {e}")
+            return result
+
+        result = await self._wait_for_leader(client, lock_key, result_key)
+        if result is not None:
+            self.stats["redis_shared"] += 1
+            return result
+        return await fn()
+
+    async def _wait_for_leader(self, client, lock_key: str, result_key: str) -> Optional[Any]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_timeout
+        try:
+            while loop.time() < deadline:
+                raw = await client.get(result_key)
+                if raw is not None:
+                    return json.loads(raw)
+                if not await client.exists(lock_key):
+                    # Leader finished (or failed) between the two reads
+                    raw = await client.get(result_key)
+                    return json.loads(raw) if raw is not None else None
+                await asyncio.sleep(self.poll_interval)
+        except redis.RedisError as e:
+            logger.warning(f"Single-flight wait failed ({self.namespace}): {e}")
+        return None
+
+    @staticmethod
+    async def _release(client, lock_key: str):
+        try:
+            await client.delete(lock_key)
+        except redis.RedisError:
+            pass
+
+
+def make_single_flight(namespace: str) -> SingleFlight:
+    return SingleFlight(
+        namespace=namespace,
+        redis_url=settings.REDIS_URL if settings.SINGLE_FLIGHT_REDIS else None,
+        lock_timeout=settings.SINGLE_FLIGHT_TIMEOUT_SECONDS,
+        result_ttl=settings.SINGLE_FLIGHT_RESULT_TTL_SECONDS,
+        enabled=settings.SINGLE_FLIGHT_ENABLED,
+    )
@@ -1,14 +1,83 @@
 import logging
-from sqlalchemy import select
-from app.db.session import SessionLocal
-from app.models.document import Chunk, Document
-from app.services.llm_factory import LLMFactory
+from typing import Optional
+from app.services.retrieval import RetrievalService
+from app.services.context_builder import ContextBuilder
+from app.services.embedding_cache import normalize_query
+from app.services.single_flight import flight_key, make_single_flight
 from google.adk.tools import ToolContext, FunctionTool
-from app.config import settings
+from opentelemetry import trace
 
 logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
 
-def search_syllabus(query: str, tool_context: ToolContext) -> dict:
+# Students of one class asking the same question at once share a single search
+retrieval_flight = make_single_flight("retrieval")
+
+def _read_filters(tool_context: ToolContext) -> dict:
+    """Reads the college/syllabus/class/subject filters stored in the session state."""
+    state = tool_context.state
+    filters = {
+        "school_name": state.get("college"),
+        "syllabus": state.get("syllabus"),
+        "class_name": state.get("class_name"),
+        "subject": state.get("subject")
+    }
+    
+    if not all(filters.values()):
+        logger.warning("Tool called with incomplete context (missing filters).")
+    return filters
+
+def _format_results(chunks) -> dict:
+    if not chunks:
+        return {
+            "status": "completed", 
+            "found": False, 
+            "message": "No relevant documents found in the uploaded textbooks."
+        }
+
+    context_text = ContextBuilder.build(chunks)
+    
+    return {
+        "status": "success", 
+        "found": True, 
+        "context": context_text
+    }
+
+async def search_syllabus_context(query: str, filters: dict, query_vec: Optional[list[float]] = None) -> dict:
+    """
+    Retrieval behind search_syllabus with explicit filters.
+    Used directly by the chat endpoints in "retrieve" mode (no tool round trip).
+    Concurrent identical searches (same filters + normalised query) run once.
+    """
+    with tracer.start_as_current_span(
+        "search_syllabus", attributes={"app.tenant": filters.get("school_name"), "app.subject": filters.get("subject")}
+    ) as span:
+        ran_here = False
+
+        async def run():
+            nonlocal ran_here
+            ran_here = True
+            chunks = await RetrievalService.search(query, filters, query_vec=query_vec)
+            span.set_attribute("retrieval.chunks", len(chunks))
+            return _format_results(chunks)
+
+        key = flight_key(filters, normalize_query(query))
+        result = await retrieval_flight.do(key, run)
+        span.set_attributes({"retrieval.found": bool(result.get("found")), "retrieval.coalesced": not ran_here})
+        return result
+
+def search_syllabus_batch(filters: dict, query_vecs: list[list[float]]) -> Optional[list[dict]]:
+    """
+    search_syllabus_context results for several already-embedded queries, searched in one pass.
+    None when the search mode can't batch (see RetrievalService.search_batch).
+    """
+    with tracer.start_as_current_span(
+        "search_syllabus.batch", attributes={"app.tenant": filters.get("school_name"), "app.subject": filters.get("subject")}
+    ):
+        results = RetrievalService.search_batch(filters, query_vecs)
+        return [_format_results(chunks) for chunks in results] if results is not None else None
+
+async def search_syllabus(query: str, tool_context: ToolContext) -> dict:
     """
     Searches the school syllabus for a specific topic.
     Returns the most relevant text chunks.
@@ -16,58 +85,16 @@ def search_syllabus(query: str, tool_context: ToolContext) -> dict:
     logger.info(f"Tool executing. Query: '{query}'")
     
     try:
-        state = tool_context.state
-        filters = {
-            "syllabus": state.get("syllabus"),
-            "class_name": state.get("class_name"),
-            "subject": state.get("subject")
-        }
-        
-        if not all(filters.values()):
-            logger.warning("Tool called with incomplete context (missing filters).")
-            
+        filters = _read_filters(tool_context)
     except Exception as e:
         logger.error(f"Failed to read tool context: {e}")
         return {"status": "error", "message": "Context error."}
 
-    with SessionLocal() as db:
-        try:
-            query_vec = LLMFactory.get_embedding_sync(query)
-            
-            conditions = []
-            if filters.get('syllabus'): 
-                conditions.append(Document.syllabus == filters['syllabus'])
-            if filters.get('class_name'): 
-                conditions.append(Document.class_name == filters['class_name'])
-            if filters.get('subject'): 
-                conditions.append(Document.subject == filters['subject'])
-            
-            stmt = select(Chunk).join(Document)
-            if conditions:
-                stmt = stmt.where(*conditions)
-            
-            limit = getattr(settings, 'SEARCH_LIMIT', 6)
-            stmt = stmt.order_by(Chunk.embedding.cosine_distance(query_vec)).limit(limit)
-            
-            chunks = db.execute(stmt).scalars().all()
-            
-            if not chunks:
-                return {
-                    "status": "completed", 
-                    "found": False, 
-                    "message": "No relevant documents found in the uploaded textbooks."
-                }
-
-            context_text = "\n\n".join([f"[Source: Doc {c.document_id}]\n{c.text}" for c in chunks])
-            
-            return {
-                "status": "success", 
-                "found": True, 
-                "context": context_text
-            }
-            
-        except Exception as e:
-            logger.error(f"Database search tool failed: {e}", exc_info=True)
-            return {"status": "error", "message": "Internal search error."}
+    try:
+        return await search_syllabus_context(query, filters)
+        
+    except Exception as e:
+        logger.error(f"Database search tool failed: {e}", exc_info=True)
+        return {"status": "error", "message": "Internal search error."}
 
-syllabus_tool = FunctionTool(func=search_syllabus)
\ No newline at end of file
+syllabus_tool = FunctionTool(func=search_syllabus)
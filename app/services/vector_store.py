@@ -0,0 +1,250 @@
+import os
+import uuid
+import fcntl
+import shutil
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from contextlib import contextmanager
+from typing import Optional
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.document import Chunk, Document, DocStatus, SHORT_EMBEDDING_DIM
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+# Rows scored per block when the stored dtype is not float32 (bounded float32 copies)
+SCORE_BLOCK_ROWS = 8192
+
+
+@dataclass
+class ChunkHit:
+    """Chunk row served from the NumPy index (duck-types the Chunk attributes retrieval uses)."""
+    id: uuid.UUID
+    document_id: uuid.UUID
+    chunk_index: int
+    text: str
+    score: float
+    embedding_short: Optional[np.ndarray] = None
+
+
+def index_dir(school_name: str, syllabus: str, class_name: str, subject: str) -> str:
+    digest = hashlib.md5("\x1f".join([school_name, syllabus, class_name, subject]).encode("utf-8")).hexdigest()
+    return os.path.join(settings.NUMPY_INDEX_DIR, digest)
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def _uuid_matrix(values: list[uuid.UUID]) -> np.ndarray:
+    # (n, 16) uint8 rather than "S16": NumPy byte strings drop trailing NUL bytes.
+    return np.frombuffer(b"".join(v.bytes for v in values), dtype=np.uint8).reshape(-1, 16)
+
+@contextmanager
+def _subject_lock(base: str):
+    """Serialises index builds of one subject across Celery processes (several documents per subject)."""
+    os.makedirs(base, exist_ok=True)
+    with open(os.path.join(base, LOCK_FILE), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _read_current(base: str) -> Optional[str]:
+    try:
+        with open(os.path.join(base, CURRENT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def build_subject_index(db: Session, school_name: str, syllabus: str, class_name: str, subject: str) -> int:
+    """
+    Exports one subject's COMPLETED chunk embeddings to a new versioned directory of .npy files
+    and atomically repoints CURRENT at it. Rows are L2-normalised so a dot product is cosine similarity.
+    Readers mmap the files, so all gunicorn workers share one copy through the page cache.
+    Builds of the same subject run one at a time (file lock).
+    Returns the number of rows written (0 removes the index).
+    """
+    with _subject_lock(index_dir(school_name, syllabus, class_name, subject)):
+        return _build_subject_index(db, school_name, syllabus, class_name, subject)
+
+def _build_subject_index(db: Session, school_name: str, syllabus: str, class_name: str, subject: str) -> int:
+    stmt = (
+        select(Chunk.id, Chunk.document_id, Chunk.chunk_index, Chunk.text, Chunk.embedding)
+        .join(Document, Document.id == Chunk.document_id)
+        .where(
+            Chunk.school_name == school_name,
+            Chunk.syllabus == syllabus,
+            Chunk.class_name == class_name,
+            Chunk.subject == subject,
+            Document.status == DocStatus.COMPLETED,
+            Chunk.embedding.is_not(None),
+        )
+        .order_by(Chunk.document_id, Chunk.chunk_index)
+    )
+    rows = db.execute(stmt).all()
+    base = index_dir(school_name, syllabus, class_name, subject)
+
+    if not rows:
+        _remove_versions(base)
+        return 0
+
+    vectors = _normalize_rows(np.vstack([np.asarray(r.embedding, dtype=np.float32) for r in rows]))
+    encoded = [r.text.encode("utf-8") for r in rows]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(t) for t in encoded])
+
+    version = uuid.uuid4().hex
+    target = os.path.join(base, version)
+    os.makedirs(target, exist_ok=True)
+
+    np.save(os.path.join(target, "vectors.npy"), vectors.astype(settings.NUMPY_INDEX_DTYPE))
+    np.save(os.path.join(target, "ids.npy"), _uuid_matrix([r.id for r in rows]))
+    np.save(os.path.join(target, "doc_ids.npy"), _uuid_matrix([r.document_id for r in rows]))
+    np.save(os.path.join(target, "chunk_index.npy"), np.array([r.chunk_index for r in rows], dtype=np.int32))
+    np.save(os.path.join(target, "offsets.npy"), offsets)
+    with open(os.path.join(target, "text.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+
+    previous = _read_current(base)
+    tmp_pointer = os.path.join(base, f"{CURRENT_FILE}.{version}")
+    with open(tmp_pointer, "w") as f:
+        f.write(version)
+    os.replace(tmp_pointer, os.path.join(base, CURRENT_FILE))
+
+    # Older versions can go: workers that still have them mapped keep the inodes alive.
+    # The previous one stays until the next build for readers that read CURRENT just before the switch.
+    for entry in os.listdir(base):
+        path = os.path.join(base, entry)
+        if entry not in (version, previous) and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+    logger.info(f"NumPy index built for {school_name}/{syllabus}/{class_name}/{subject}: {len(rows)} chunks.")
+    return len(rows)
+
+def _remove_versions(base: str):
+    """Drops CURRENT and every version (the lock file stays, it may be held)."""
+    try:
+        os.remove(os.path.join(base, CURRENT_FILE))
+    except FileNotFoundError:
+        pass
+    for entry in os.listdir(base):
+        path = os.path.join(base, entry)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+def remove_subject_index(school_name: str, syllabus: str, class_name: str, subject: str):
+    base = index_dir(school_name, syllabus, class_name, subject)
+    if not os.path.isdir(base):
+        return
+    with _subject_lock(base):
+        _remove_versions(base)
+
+def rebuild_all_subject_indexes(db: Session) -> int:
+    """Builds the NumPy index for every subject that has chunks. Returns the number of subjects."""
+    keys = db.execute(
+        select(Chunk.school_name, Chunk.syllabus, Chunk.class_name, Chunk.subject).distinct()
+    ).all()
+    for key in keys:
+        build_subject_index(db, *key)
+    return len(keys)
+
+
+class _LoadedIndex:
+    def __init__(self, path: str):
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self.doc_ids = np.load(os.path.join(path, "doc_ids.npy"), mmap_mode="r")
+        self.chunk_index = np.load(os.path.join(path, "chunk_index.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.text = np.memmap(os.path.join(path, "text.bin"), dtype=np.uint8, mode="r") if self.offsets[-1] else None
+
+    def hit(self, row: int, score: float) -> ChunkHit:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return ChunkHit(
+            id=uuid.UUID(bytes=self.ids[row].tobytes()),
+            document_id=uuid.UUID(bytes=self.doc_ids[row].tobytes()),
+            chunk_index=int(self.chunk_index[row]),
+            text=self.text[start:end].tobytes().decode("utf-8") if self.text is not None else "",
+            score=score,
+            embedding_short=self.vectors[row, :SHORT_EMBEDDING_DIM],
+        )
+
+
+class NumpyVectorIndex:
+    """
+    Per-process view over the shared subject index files.
+    The CURRENT pointer is re-read on every lookup, so a rebuild by the Celery worker
+    is picked up by all API workers without a restart.
+    """
+    _loaded: dict = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get(cls, filters: dict) -> Optional[_LoadedIndex]:
+        keys = [filters.get("school_name"), filters.get("syllabus"), filters.get("class_name"), filters.get("subject")]
+        if not all(keys):
+            return None
+
+        base = index_dir(*keys)
+        version = _read_current(base)
+        if version is None:
+            return None
+
+        cached = cls._loaded.get(base)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        with cls._lock:
+            cached = cls._loaded.get(base)
+            if cached and cached[0] == version:
+                return cached[1]
+            try:
+                loaded = _LoadedIndex(os.path.join(base, version))
+            except FileNotFoundError:
+                return None
+            cls._loaded[base] = (version, loaded)
+            return loaded
+
+    @classmethod
+    def search_batch(cls, filters: dict, query_vecs: list[list[float]], k: int) -> Optional[list[list[ChunkHit]]]:
+        """
+        Exact top-k by cosine similarity for several queries with one matrix product.
+        Returns None when the subject has no exported index (caller falls back to pgvector).
+        """
+        index = cls._get(filters)
+        if index is None:
+            return None
+        if len(index.vectors) == 0:
+            return [[] for _ in query_vecs]
+
+        queries = _normalize_rows(np.asarray(query_vecs, dtype=np.float32))
+        vectors = index.vectors
+        if vectors.dtype == np.float32:
+            scores = queries @ vectors.T
+        else:
+            # Converting the whole mmapped matrix would copy it into private memory on every query
+            scores = np.empty((len(queries), len(vectors)), dtype=np.float32)
+            for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+                block = vectors[start:start + SCORE_BLOCK_ROWS]
+                scores[:, start:start + len(block)] = queries @ block.astype(np.float32).T
+
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for qi, rows in enumerate(top):
+            ordered = rows[np.argsort(-scores[qi, rows])]
+            results.append([index.hit(int(r), float(scores[qi, r])) for r in ordered])
+        return results
+
+    @classmethod
+    def search(cls, filters: dict, query_vec: list[float], k: int) -> Optional[list[ChunkHit]]:
+        results = cls.search_batch(filters, [query_vec], k)
+        return results[0] if results is not None else None
@@ -1,9 +1,17 @@
+import os
+import time
 import logging
 from celery import Celery
+from celery.signals import celeryd_init, worker_process_shutdown
 from app.config import settings
 from app.db.session import SessionLocal
 from app.models.document import Document
 from app.services.ingestion import IngestionService
+from app.services.vector_store import build_subject_index
+from app.core.metrics import (
+    INGEST_CHUNKS, INGEST_DOCUMENTS, INGEST_DURATION, INGEST_EMBEDDINGS, INGEST_PAGES,
+    mark_process_dead, start_celery_metrics_server
+)
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +26,15 @@ celery_app.conf.update(
     task_acks_late=True,
 )
 
+@celeryd_init.connect
+def start_metrics_server(**kwargs):
+    if settings.METRICS_ENABLED and settings.CELERY_METRICS_PORT:
+        start_celery_metrics_server(settings.CELERY_METRICS_PORT)
+
+@worker_process_shutdown.connect
+def drop_process_metrics(**kwargs):
+    mark_process_dead(os.getpid())
+
 @celery_app.task(bind=True, max_retries=3)
 def ingest_pdf_task(self, doc_id_str: str):
     """
@@ -39,9 +56,37 @@ def ingest_pdf_task(self, doc_id_str: str):
             logger.warning(f"Document {doc_id_str} not found in DB. Aborting task.")
             return
 
-        IngestionService.process_document(db, doc)
-        
+        started = time.perf_counter()
+        try:
+            counts = IngestionService.process_document(db, doc)
+        except Exception:
+            INGEST_DOCUMENTS.labels("failed").inc()
+            raise
+        finally:
+            # A failed re-ingestion has already replaced the document's chunks, so the export must follow either way
+            if settings.SEARCH_MODE == "numpy":
+                rebuild_subject_index_task(doc.school_name, doc.syllabus, doc.class_name, doc.subject)
+        INGEST_DOCUMENTS.labels("completed").inc()
+        INGEST_DURATION.observe(time.perf_counter() - started)
+        INGEST_PAGES.inc(counts["pages"])
+        INGEST_CHUNKS.inc(counts["chunks"])
+        INGEST_EMBEDDINGS.inc(counts["chunks"])
+
     except Exception as e:
         logger.error(f"Critical Worker Failure for {doc_id_str}: {e}", exc_info=True)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@celery_app.task
+def rebuild_subject_index_task(school_name: str, syllabus: str, class_name: str, subject: str):
+    """
+    Re-exports one subject's NumPy vector index.
+    Queued by the API/Admin after a document is deleted or moved to another subject.
+    """
+    db = SessionLocal()
+    try:
+        build_subject_index(db, school_name, syllabus, class_name, subject)
+    except Exception as e:
+        logger.error(f"NumPy index rebuild failed for {school_name}/{syllabus}/{class_name}/{subject}: {e}", exc_info=True)
+    finally:
+        db.close()
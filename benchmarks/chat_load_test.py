@@ -0,0 +1,362 @@
+"""
+Chat load test: capacity of one API worker against stub model and embedding providers.
+
+Loads the retrieval benchmark's synthetic corpus under its benchmark tenant, starts the
+real FastAPI app (uvicorn, one worker, real Postgres/Redis) in this process with the
+providers replaced by deterministic stubs (benchmarks/stub_providers.py), and drives
+POST /chat from a separate client process, one step per load level:
+
+- --concurrency: closed loop, N simulated users each sending their next question as soon
+  as the previous answer arrives (--turns questions per session)
+- --rps: open loop, requests start on schedule whether or not earlier ones finished
+  (a new session per request)
+
+Each step reports throughput, p50/p95/p99 latency and errors by status, plus saturation
+signals sampled inside the server: event loop lag, async DB pool usage and stub provider
+in-flight calls / queueing. The first step where throughput stops growing is reported as
+the saturation point, with the signals that were hot there.
+
+Run from the project root against a migrated database:
+
+    python -m benchmarks.chat_load_test --concurrency 5,10,20,40 --duration 30 --output load.json
+    python -m benchmarks.chat_load_test --reuse --rps 5,10,20 --llm-latency-ms 1500 --provider-concurrency 16
+"""
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import platform
+import itertools
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import httpx
+import numpy as np
+
+from app.config import settings
+from app.db.session import SessionLocal, async_engine
+from app.services.readiness import readiness_cache
+from benchmarks import stub_providers
+from benchmarks.local_embeddings import LocalEmbedder
+from benchmarks.retrieval_benchmark import BENCH_TENANT, make_corpus, make_queries, load_corpus, clear_corpus
+
+# Thresholds for flagging a saturation signal in a step
+LOOP_LAG_LIMIT_MS = 50
+DB_POOL_BUSY_SHARE = 0.1
+PROVIDER_WAIT_SHARE = 0.1
+# A step is past saturation when throughput grows by less than this over the previous step
+MIN_THROUGHPUT_GAIN = 0.1
+
+
+def chat_body(question: str, session_id: str, mode: Optional[str]) -> dict:
+    body = {
+        "chatbot_user_id": session_id,
+        "question": question,
+        "college": BENCH_TENANT["school_name"],
+        "syllabus": BENCH_TENANT["syllabus"],
+        "class_name": BENCH_TENANT["class_name"],
+        "subject": BENCH_TENANT["subject"],
+    }
+    if mode:
+        body["mode"] = mode
+    return body
+
+
+def drive(url: str, questions: list[str], level: float, open_loop: bool, duration: float,
+          turns: int, mode: Optional[str], timeout: float) -> tuple[list, list]:
+    """Client process: runs one load step, returns (start offset s, latency ms, status) per request and the session ids."""
+    return asyncio.run(_drive(url, questions, level, open_loop, duration, turns, mode, timeout))
+
+async def _drive(url, questions, level, open_loop, duration, turns, mode, timeout):
+    run_id = uuid.uuid4().hex[:8]
+    results = []
+    sessions = set()
+    counter = itertools.count()
+    limits = httpx.Limits(max_connections=None if open_loop else int(level), max_keepalive_connections=100)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+
+        async def one(session_id: str):
+            i = next(counter)
+            sessions.add(session_id)
+            sent = time.perf_counter()
+            try:
+                response = await client.post("/api/v1/chat", json=chat_body(questions[i % len(questions)], session_id, mode))
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0  # timeout / connection error
+            results.append((sent - started, (time.perf_counter() - sent) * 1000, status))
+
+        if open_loop:
+            tasks = []
+            for i in itertools.count():
+                at = started + i / level
+                if at >= deadline:
+                    break
+                await asyncio.sleep(max(0.0, at - time.perf_counter()))
+                tasks.append(asyncio.create_task(one(f"load-{run_id}-{i}")))
+            await asyncio.gather(*tasks)
+        else:
+            async def user(u: int):
+                for turn in itertools.count():
+                    if time.perf_counter() >= deadline:
+                        return
+                    await one(f"load-{run_id}-{u}-{turn // turns}")
+
+            await asyncio.gather(*(user(u) for u in range(int(level))))
+
+    return results, sorted(sessions)
+
+
+class SaturationMonitor:
+    """Samples, inside the server's event loop, its scheduling lag and the async DB pool usage."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self._task = None
+        self.reset()
+
+    def reset(self):
+        self.lags = []
+        self.pool_checked_out = []
+        for gate in stub_providers.provider_gates.values():
+            gate.reset()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - started - self.interval))
+            self.pool_checked_out.append(async_engine.sync_engine.pool.checkedout())
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def snapshot(self) -> dict:
+        pool = async_engine.sync_engine.pool
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        lags_ms = np.asarray(self.lags or [0.0]) * 1000
+        checked_out = self.pool_checked_out or [0]
+        return {
+            "loop_lag_p99_ms": round(float(np.percentile(lags_ms, 99)), 1),
+            "loop_lag_max_ms": round(float(lags_ms.max()), 1),
+            "db_pool_capacity": capacity,
+            "db_pool_peak": max(checked_out),
+            "db_pool_busy_share": round(sum(c >= capacity for c in checked_out) / len(checked_out), 3),
+            "providers": {name: gate.snapshot() for name, gate in stub_providers.provider_gates.items()},
+        }
+
+
+def hot_signals(step: dict) -> list[str]:
+    """Saturation signals of a step: which shared resource requests were waiting on."""
+    signals = []
+    if step["loop_lag_p99_ms"] > LOOP_LAG_LIMIT_MS:
+        signals.append("event loop")
+    if step["db_pool_busy_share"] > DB_POOL_BUSY_SHARE:
+        signals.append("db pool")
+    for name, provider in step["providers"].items():
+        if provider["calls"] and provider["wait_mean_ms"] > step["p50_ms"] * PROVIDER_WAIT_SHARE:
+            signals.append(f"provider concurrency ({name})")
+    if step["statuses"].get("429", 0) > 0:
+        signals.append("admission control")
+    return signals
+
+def summarize(level: float, open_loop: bool, results: list, elapsed: float, server: dict) -> dict:
+    latencies = [latency for _, latency, status in results if status == 200] or [0.0]
+    statuses = Counter(str(status) for _, _, status in results)
+    errors = len(results) - statuses.get("200", 0)
+    step = {
+        "load": {"rps" if open_loop else "concurrency": level},
+        "requests": len(results),
+        "throughput_rps": round(statuses.get("200", 0) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "statuses": dict(statuses),
+        **server,
+    }
+    step["signals"] = hot_signals(step)
+    print(f"{'rps' if open_loop else 'users'}={level:<6} thr={step['throughput_rps']:>7}/s p50={step['p50_ms']:>8}ms "
+          f"p95={step['p95_ms']:>8}ms p99={step['p99_ms']:>8}ms err={step['error_rate']:.2%} "
+          f"lag_p99={step['loop_lag_p99_ms']}ms pool_peak={step['db_pool_peak']}/{step['db_pool_capacity']} "
+          f"signals={','.join(step['signals']) or '-'}", file=sys.stderr)
+    return step
+
+def saturation_point(steps: list[dict]) -> Optional[dict]:
+    """First step whose throughput grew less than MIN_THROUGHPUT_GAIN over the previous step."""
+    for previous, step in zip(steps, steps[1:]):
+        if step["throughput_rps"] < previous["throughput_rps"] * (1 + MIN_THROUGHPUT_GAIN):
+            return {"load": step["load"], "throughput_rps": previous["throughput_rps"], "signals": step["signals"]}
+    return None
+
+
+async def delete_sessions(session_ids: list[str]):
+    from app.api.v1.chat import session_service
+
+    semaphore = asyncio.Semaphore(10)
+
+    async def delete(session_id: str):
+        async with semaphore:
+            try:
+                await session_service.delete_session(
+                    app_name=settings.PROJECT_NAME, user_id=settings.USER_ID, session_id=session_id
+                )
+            except Exception as e:
+                print(f"Session cleanup failed for {session_id}: {e}", file=sys.stderr)
+
+    await asyncio.gather(*(delete(s) for s in session_ids))
+
+async def run_load(args, questions: list[str], levels: list[float]) -> list[dict]:
+    import uvicorn
+    import main
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            raise SystemExit(f"Server failed to start on port {args.port}")
+        await asyncio.sleep(0.05)
+
+    url = f"http://127.0.0.1:{args.port}"
+    loop = asyncio.get_running_loop()
+    monitor = SaturationMonitor()
+    monitor.start()
+    steps = []
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as client:
+            # Warm-up: runners, DB/Redis connections and the client process itself
+            _, sessions = await loop.run_in_executor(
+                client, drive, url, questions, 2, False, args.warmup, 1, args.mode, args.timeout
+            )
+            await delete_sessions(sessions)
+
+            for level in levels:
+                monitor.reset()
+                started = time.perf_counter()
+                results, sessions = await loop.run_in_executor(
+                    client, drive, url, questions, level, args.rps is not None, args.duration,
+                    args.turns, args.mode, args.timeout
+                )
+                elapsed = time.perf_counter() - started
+                steps.append(summarize(level, args.rps is not None, results, elapsed, monitor.snapshot()))
+                await delete_sessions(sessions)
+    finally:
+        await monitor.stop()
+        server.should_exit = True
+        await serving
+    return steps
+
+
+def parse_levels(value: str) -> list[float]:
+    return [float(v) for v in value.split(",") if v.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /chat with stub LLM and embedding providers.")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", default="5,10,20,40", help="Comma-separated concurrent users per step (closed loop).")
+    load.add_argument("--rps", help="Comma-separated request rates per step (open loop).")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per step.")
+    parser.add_argument("--warmup", type=float, default=5, help="Warm-up seconds before the first step.")
+    parser.add_argument("--turns", type=int, default=3, help="Questions per session in closed-loop steps.")
+    parser.add_argument("--mode", choices=["agent", "retrieve"], help="Chat mode (default: CHAT_MODE).")
+    parser.add_argument("--timeout", type=float, default=60, help="Client timeout per request in seconds.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency-ms", type=float, default=1000, help="Stub answer latency.")
+    parser.add_argument("--llm-jitter-ms", type=float, default=300, help="Stub answer latency spread (+-).")
+    parser.add_argument("--llm-tool-latency-ms", type=float, default=400, help="Stub latency of a tool call turn.")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of stub model calls that fail.")
+    parser.add_argument("--provider-concurrency", type=int, default=0, help="Concurrent calls per stub provider (0 = unlimited).")
+    parser.add_argument("--embed-latency-ms", type=float, default=50, help="Stub embedding latency.")
+    parser.add_argument("--chunks", type=int, default=5000, help="Synthetic corpus size.")
+    parser.add_argument("--queries", type=int, default=500, help="Distinct questions.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reuse", action="store_true", help="Reuse the corpus loaded by a previous run.")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the benchmark corpus afterwards.")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logs.")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout).")
+    args = parser.parse_args()
+
+    open_loop = args.rps is not None
+    levels = parse_levels(args.rps if open_loop else args.concurrency)
+    corpus = make_corpus(args.chunks, args.seed)
+    questions = make_queries(corpus, args.queries, args.seed)
+
+    with SessionLocal() as db:
+        if not args.reuse:
+            started = time.perf_counter()
+            load_corpus(db, corpus, LocalEmbedder())
+            print(f"Loaded {len(corpus)} chunks in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        readiness_cache.refresh_sync(db, tuple(BENCH_TENANT.values()))
+
+    stub_providers.install(
+        latency=args.llm_latency_ms / 1000,
+        jitter=args.llm_jitter_ms / 1000,
+        tool_latency=args.llm_tool_latency_ms / 1000,
+        error_rate=args.llm_error_rate,
+        provider_concurrency=args.provider_concurrency,
+        embed_latency=args.embed_latency_ms / 1000,
+    )
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    steps = asyncio.run(run_load(args, questions, levels))
+
+    if args.cleanup:
+        with SessionLocal() as db:
+            clear_corpus(db)
+            readiness_cache.refresh_sync(db, tuple(BENCH_TENANT.values()))
+
+    report = {
+        "config": {
+            "load": "rps" if open_loop else "concurrency",
+            "duration_s": args.duration,
+            "turns": None if open_loop else args.turns,
+            "mode": args.mode or settings.CHAT_MODE,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_tool_latency_ms": args.llm_tool_latency_ms,
+            "llm_error_rate": args.llm_error_rate,
+            "provider_concurrency": args.provider_concurrency,
+            "embed_latency_ms": args.embed_latency_ms,
+            "chunks": args.chunks,
+            "session_store": settings.SESSION_STORE,
+            "search_mode": settings.SEARCH_MODE,
+            "admission_enabled": settings.ADMISSION_ENABLED,
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "steps": steps,
+        "saturation": saturation_point(steps),
+    }
+    saturation = report["saturation"]
+    if saturation:
+        print(f"Saturates at {saturation['load']} (~{saturation['throughput_rps']} rps): "
+              f"{', '.join(saturation['signals']) or 'no server-side signal (check the client or the host CPU)'}", file=sys.stderr)
+    else:
+        print("No saturation within the tested load levels.", file=sys.stderr)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
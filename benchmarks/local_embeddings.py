@@ -0,0 +1,36 @@
+import re
+import hashlib
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+class LocalEmbedder:
+    """
+    Deterministic stand-in for the Gemini embedding model.
+    Each token maps to a fixed pseudo-random unit vector (seeded from its hash) and a text
+    embeds to the normalised sum of its tokens, so texts that share words are close in
+    cosine space. No network, same output on every machine.
+    """
+
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+        self._token_cache = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_cache.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.md5(token.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            self._token_cache[token] = vector
+        return vector
+
+    def embed(self, text: str) -> list[float]:
+        tokens = TOKEN_RE.findall(text.lower())
+        if not tokens:
+            return [0.0] * self.dim
+        vector = np.sum([self._token_vector(t) for t in tokens], axis=0)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed(t) for t in texts]
@@ -0,0 +1,294 @@
+"""
+Retrieval benchmark: recall@k vs. latency for each search engine.
+
+Loads a synthetic corpus (deterministic local embeddings, no Gemini calls) into
+documents/chunks under a dedicated benchmark tenant, runs a fixed query set through
+each retrieval mode and writes p50/p95/p99 latency, QPS and recall@k against the
+exact cosine ranking as JSON.
+
+Run from the project root against a migrated database:
+
+    python -m benchmarks.retrieval_benchmark --chunks 5000 --queries 200 --output bench.json
+    python -m benchmarks.retrieval_benchmark --reuse --baseline bench.json --output bench_new.json
+
+With --baseline the run exits non-zero when a mode's p95 or recall regresses.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from sqlalchemy import select, delete, insert, update, text, func, cast
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+from app.config import settings
+from app.db.session import SessionLocal
+from app.db.vector_utils import ensure_chunk_partition, vector_search_params_stmt
+from app.models.document import Document, Chunk, DocStatus, SHORT_EMBEDDING_DIM, FTS_CONFIG
+from app.services.retrieval import build_filter_conditions, vector_search_stmt, lexical_search_stmt, reciprocal_rank_fusion
+from app.services.vector_store import build_subject_index, remove_subject_index, NumpyVectorIndex
+from benchmarks.local_embeddings import LocalEmbedder
+
+BENCH_TENANT = {
+    "school_name": "__bench_school__",
+    "syllabus": "__bench_syllabus__",
+    "class_name": "__bench_class__",
+    "subject": "__bench_subject__",
+}
+CHUNKS_PER_DOCUMENT = 50
+WORDS_PER_CHUNK = 250
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "si", "pe", "da", "gu", "fi", "zo", "be", "ha", "xu"]
+
+
+def make_corpus(n_chunks: int, seed: int) -> list[str]:
+    """Topic-structured pseudo-text: each chunk mostly draws words from one of 50 topics."""
+    rng = random.Random(seed)
+    vocab = sorted({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(6000)})
+    topics = [rng.sample(vocab, 120) for _ in range(50)]
+
+    corpus = []
+    for _ in range(n_chunks):
+        topic = rng.choice(topics)
+        words = [rng.choice(topic) if rng.random() < 0.7 else rng.choice(vocab) for _ in range(WORDS_PER_CHUNK)]
+        corpus.append(" ".join(words))
+    return corpus
+
+def make_queries(corpus: list[str], n_queries: int, seed: int) -> list[str]:
+    """Each query is a handful of words sampled from one chunk, like a short student question."""
+    rng = random.Random(seed + 1)
+    return [" ".join(rng.sample(rng.choice(corpus).split(), 6)) for _ in range(n_queries)]
+
+def clear_corpus(db):
+    db.execute(delete(Document).where(Document.school_name == BENCH_TENANT["school_name"]))
+    db.commit()
+    remove_subject_index(*BENCH_TENANT.values())
+
+def load_corpus(db, corpus: list[str], embedder: LocalEmbedder):
+    clear_corpus(db)
+    ensure_chunk_partition(db, BENCH_TENANT["school_name"])
+
+    for start in range(0, len(corpus), CHUNKS_PER_DOCUMENT):
+        doc = Document(display_name=f"bench-{start // CHUNKS_PER_DOCUMENT}", status=DocStatus.COMPLETED, **BENCH_TENANT)
+        db.add(doc)
+        db.flush()
+
+        rows = []
+        for i, chunk_text in enumerate(corpus[start:start + CHUNKS_PER_DOCUMENT]):
+            vector = embedder.embed(chunk_text)
+            rows.append({
+                "document_id": doc.id,
+                "chunk_index": i,
+                "text": chunk_text,
+                "embedding": vector,
+                "embedding_short": vector[:SHORT_EMBEDDING_DIM],
+                **BENCH_TENANT,
+            })
+        db.execute(insert(Chunk), rows)
+        db.commit()
+
+    db.execute(
+        update(Chunk)
+        .where(Chunk.school_name == BENCH_TENANT["school_name"])
+        .values(search_vector=func.to_tsvector(cast(FTS_CONFIG, REGCONFIG), Chunk.text))
+    )
+    db.commit()
+    db.execute(text("ANALYZE chunks"))
+    db.commit()
+
+def load_ground_truth(db, query_vecs: np.ndarray, k: int) -> list[set]:
+    """Exact top-k ids by cosine similarity, computed in NumPy independently of the database."""
+    rows = db.execute(
+        select(Chunk.id, Chunk.embedding).where(*build_filter_conditions(BENCH_TENANT))
+    ).all()
+    if not rows:
+        raise SystemExit("Benchmark corpus is empty. Run without --reuse to load it.")
+
+    ids = [r.id for r in rows]
+    matrix = np.vstack([np.asarray(r.embedding, dtype=np.float32) for r in rows])
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = query_vecs @ matrix.T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return [{ids[i] for i in row} for row in top]
+
+
+def exact_search(db, query: str, vec: list[float], k: int) -> list:
+    db.execute(text("SET LOCAL enable_indexscan = off"))
+    db.execute(text("SET LOCAL enable_bitmapscan = off"))
+    stmt = (
+        select(Chunk.id)
+        .where(*build_filter_conditions(BENCH_TENANT))
+        .order_by(Chunk.embedding.cosine_distance(vec))
+        .limit(k)
+    )
+    return list(db.execute(stmt).scalars().all())
+
+def ann_search(ef_search: int = None, probes: int = None):
+    def run(db, query: str, vec: list[float], k: int) -> list:
+        db.execute(vector_search_params_stmt(ef_search=ef_search, probes=probes))
+        return [c.id for c in db.execute(vector_search_stmt(vec, BENCH_TENANT, k)).scalars().all()]
+    return run
+
+def hybrid_search(db, query: str, vec: list[float], k: int) -> list:
+    db.execute(vector_search_params_stmt())
+    lexical = db.execute(lexical_search_stmt(query, BENCH_TENANT, settings.HYBRID_LEXICAL_CANDIDATES)).scalars().all()
+    vector = db.execute(vector_search_stmt(vec, BENCH_TENANT, settings.HYBRID_VECTOR_CANDIDATES)).scalars().all()
+    return [c.id for c in reciprocal_rank_fusion([list(lexical), list(vector)], k)]
+
+def numpy_search(db, query: str, vec: list[float], k: int) -> list:
+    return [h.id for h in NumpyVectorIndex.search(BENCH_TENANT, vec, k)]
+
+
+def run_mode(name: str, params: dict, search_fn, queries: list[str], query_vecs: list, truth: list[set], k: int, concurrency: int) -> dict:
+    latencies = [0.0] * len(queries)
+    recalls = [0.0] * len(queries)
+    local = threading.local()
+
+    def one(i: int):
+        if not hasattr(local, "db"):
+            local.db = SessionLocal()
+        db = local.db
+        started = time.perf_counter()
+        ids = search_fn(db, queries[i], query_vecs[i], k)
+        latencies[i] = (time.perf_counter() - started) * 1000
+        db.rollback()
+        recalls[i] = len(set(ids[:k]) & truth[i]) / k
+
+    # Warm-up pass so connection setup and cold caches do not skew percentiles.
+    with SessionLocal() as db:
+        for i in range(min(10, len(queries))):
+            search_fn(db, queries[i], query_vecs[i], k)
+            db.rollback()
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(len(queries))))
+    wall = time.perf_counter() - wall_started
+
+    result = {
+        "mode": name,
+        "params": params,
+        "queries": len(queries),
+        "concurrency": concurrency,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "mean_ms": round(float(np.mean(latencies)), 3),
+        "qps": round(len(queries) / wall, 2),
+        f"recall_at_{k}": round(float(np.mean(recalls)), 4),
+    }
+    print(f"{name:<8} {json.dumps(params):<24} p50={result['p50_ms']:>8}ms p95={result['p95_ms']:>8}ms "
+          f"p99={result['p99_ms']:>8}ms qps={result['qps']:>8} recall@{k}={result[f'recall_at_{k}']}", file=sys.stderr)
+    return result
+
+def result_key(result: dict) -> str:
+    return f"{result['mode']}:{json.dumps(result['params'], sort_keys=True)}"
+
+def compare(report: dict, baseline_path: str, max_latency_regression: float, max_recall_drop: float) -> bool:
+    """Prints per-mode deltas against a previous report; returns False if anything regressed."""
+    with open(baseline_path) as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+
+    recall_field = f"recall_at_{report['config']['k']}"
+    ok = True
+    for result in report["results"]:
+        old = baseline.get(result_key(result))
+        if not old:
+            continue
+        p95_delta = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+        recall_delta = result[recall_field] - old.get(recall_field, 0.0)
+        regressed = p95_delta > max_latency_regression or recall_delta < -max_recall_drop
+        ok = ok and not regressed
+        print(f"{'REGRESSION' if regressed else 'ok':<10} {result_key(result):<40} "
+              f"p95 {p95_delta:+.1%}  recall {recall_delta:+.4f}", file=sys.stderr)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval latency and recall across search engines.")
+    parser.add_argument("--chunks", type=int, default=5000, help="Synthetic corpus size.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of benchmark queries.")
+    parser.add_argument("--k", type=int, default=settings.SEARCH_LIMIT, help="Results per query (recall@k).")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent client threads.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ef-search", default="20,40,100,200", help="Comma-separated hnsw.ef_search values.")
+    parser.add_argument("--probes", default="1,5,10,20", help="Comma-separated ivfflat.probes values.")
+    parser.add_argument("--modes", default="exact,ann,hybrid,numpy", help="Comma-separated modes to run.")
+    parser.add_argument("--reuse", action="store_true", help="Reuse the corpus loaded by a previous run.")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the benchmark corpus afterwards.")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout).")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against.")
+    parser.add_argument("--max-latency-regression", type=float, default=0.2, help="Allowed relative p95 increase.")
+    parser.add_argument("--max-recall-drop", type=float, default=0.01, help="Allowed absolute recall decrease.")
+    args = parser.parse_args()
+
+    embedder = LocalEmbedder()
+    corpus = make_corpus(args.chunks, args.seed)
+    queries = make_queries(corpus, args.queries, args.seed)
+    query_vecs = embedder.embed_batch(queries)
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+
+    with SessionLocal() as db:
+        if not args.reuse:
+            started = time.perf_counter()
+            load_corpus(db, corpus, embedder)
+            print(f"Loaded {len(corpus)} chunks in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        truth = load_ground_truth(db, np.asarray(query_vecs, dtype=np.float32), args.k)
+
+    report = {
+        "config": {
+            "chunks": args.chunks,
+            "queries": args.queries,
+            "k": args.k,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "vector_index_type": settings.VECTOR_INDEX_TYPE,
+            "embedding_storage": settings.EMBEDDING_STORAGE,
+            "rerank_candidates": settings.RERANK_CANDIDATES,
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": [],
+    }
+    run = lambda name, params, fn: report["results"].append(
+        run_mode(name, params, fn, queries, query_vecs, truth, args.k, args.concurrency)
+    )
+
+    if "exact" in modes:
+        run("exact", {}, exact_search)
+    if "ann" in modes:
+        if settings.VECTOR_INDEX_TYPE == "ivfflat":
+            for probes in [int(p) for p in args.probes.split(",")]:
+                run("ann", {"probes": probes}, ann_search(probes=probes))
+        else:
+            for ef in [int(e) for e in args.ef_search.split(",")]:
+                run("ann", {"ef_search": ef}, ann_search(ef_search=ef))
+    if "hybrid" in modes:
+        run("hybrid", {"lexical": settings.HYBRID_LEXICAL_CANDIDATES, "vector": settings.HYBRID_VECTOR_CANDIDATES}, hybrid_search)
+    if "numpy" in modes:
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            build_subject_index(db, *BENCH_TENANT.values())
+            report["config"]["numpy_build_s"] = round(time.perf_counter() - started, 3)
+        run("numpy", {"dtype": settings.NUMPY_INDEX_DTYPE}, numpy_search)
+
+    if args.cleanup:
+        with SessionLocal() as db:
+            clear_corpus(db)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.baseline and not compare(report, args.baseline, args.max_latency_regression, args.max_recall_drop):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
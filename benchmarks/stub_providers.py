@@ -0,0 +1,232 @@
+"""
+Deterministic stand-ins for the external model providers, for load tests without API quota.
+
+- StubLlm replaces the ADK model wrappers (Gemini / LiteLlm): it calls search_syllabus once
+  when the agent has the tool, then answers, with configurable latency and an optional cap on
+  concurrent calls per provider (like a provider's rate limit).
+- StubGenaiClient replaces the google-genai client behind LLMFactory (embeddings, via
+  LocalEmbedder) and the history summariser.
+
+install() swaps both into the running process; call it before the app starts serving.
+"""
+import time
+import random
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from benchmarks.local_embeddings import LocalEmbedder
+
+WORDS = ["the", "answer", "follows", "from", "the", "textbook", "chapter", "on", "this", "topic"]
+
+
+def _seeded(text: str) -> random.Random:
+    return random.Random(int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:8], "little"))
+
+
+class ProviderGate:
+    """Concurrency cap of one stub provider (0 = unlimited), with in-flight and queueing counters."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit) if limit else None
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        started = time.perf_counter()
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            if self._semaphore:
+                await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - started
+        self.calls += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self._semaphore:
+                self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "limit": self.limit,
+            "peak_in_flight": self.peak_in_flight,
+            "peak_waiting": self.peak_waiting,
+            "wait_mean_ms": round(self.wait_total / self.calls * 1000, 1) if self.calls else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 1),
+        }
+
+
+# provider -> gate, shared by all StubLlm instances of that provider (one per agent)
+provider_gates: dict[str, ProviderGate] = {}
+
+
+class StubLlm(BaseLlm):
+    """
+    Deterministic model: the latency of a call is `latency` +- `jitter` seconds, seeded from
+    the request text, so the same question always takes as long. A tool call turn takes
+    `tool_latency`. With `error_rate`, that share of calls fails before the first response.
+    """
+
+    provider: str
+    latency: float = 1.0
+    jitter: float = 0.3
+    tool_latency: float = 0.4
+    error_rate: float = 0.0
+
+    @staticmethod
+    def _question(llm_request: LlmRequest) -> str:
+        for content in reversed(llm_request.contents):
+            texts = [p.text for p in content.parts or [] if p.text]
+            if content.role == "user" and texts:
+                return texts[-1]
+        return ""
+
+    @staticmethod
+    def _usage(llm_request: LlmRequest, answer: str) -> types.GenerateContentResponseUsageMetadata:
+        prompt_chars = len(str(llm_request.config.system_instruction or "")) if llm_request.config else 0
+        for content in llm_request.contents:
+            prompt_chars += sum(len(p.text or "") for p in content.parts or [])
+        prompt_tokens, output_tokens = prompt_chars // 4, len(answer) // 4
+        return types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        question = self._question(llm_request)
+        last = llm_request.contents[-1] if llm_request.contents else None
+        answered_tool = bool(last and any(p.function_response for p in last.parts or []))
+        rng = _seeded(f"{self.provider}:{question}:{answered_tool}")
+
+        async with provider_gates[self.provider].slot():
+            if rng.random() < self.error_rate:
+                await asyncio.sleep(self.tool_latency)
+                raise RuntimeError(f"Stub provider {self.provider} failed")
+
+            if "search_syllabus" in llm_request.tools_dict and not answered_tool:
+                await asyncio.sleep(self.tool_latency)
+                call = types.FunctionCall(name="search_syllabus", args={"query": question})
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(function_call=call)]),
+                    usage_metadata=self._usage(llm_request, question)
+                )
+                return
+
+            delay = max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+            words = [rng.choice(WORDS) for _ in range(40)]
+            answer = " ".join(words)
+            if stream:
+                for i in range(0, len(words), 10):
+                    await asyncio.sleep(delay / 4)
+                    yield LlmResponse(
+                        content=types.Content(role="model", parts=[types.Part(text=" ".join(words[i:i + 10]) + " ")]),
+                        partial=True
+                    )
+            else:
+                await asyncio.sleep(delay)
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(text=answer)]),
+                usage_metadata=self._usage(llm_request, answer)
+            )
+
+
+class _StubModels:
+    def __init__(self, embedder: LocalEmbedder, embed_latency: float):
+        self._embedder = embedder
+        self._embed_latency = embed_latency
+
+    def _embeddings(self, contents) -> types.EmbedContentResponse:
+        texts = [contents] if isinstance(contents, str) else list(contents)
+        return types.EmbedContentResponse(
+            embeddings=[types.ContentEmbedding(values=vector) for vector in self._embedder.embed_batch(texts)]
+        )
+
+    def embed_content(self, model: str, contents, config=None) -> types.EmbedContentResponse:
+        time.sleep(self._embed_latency)
+        return self._embeddings(contents)
+
+
+class _StubAsyncModels(_StubModels):
+    def __init__(self, embedder: LocalEmbedder, embed_latency: float, summary_latency: float):
+        super().__init__(embedder, embed_latency)
+        self._summary_latency = summary_latency
+
+    async def embed_content(self, model: str, contents, config=None) -> types.EmbedContentResponse:
+        await asyncio.sleep(self._embed_latency)
+        return self._embeddings(contents)
+
+    async def generate_content(self, model: str, contents, config=None) -> types.GenerateContentResponse:
+        await asyncio.sleep(self._summary_latency)
+        summary = f"Earlier the student asked {len(str(contents)) // 500 + 1} questions about this subject."
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text=summary)]))]
+        )
+
+
+class StubGenaiClient:
+    """The parts of google.genai.Client the app uses outside the ADK models."""
+
+    def __init__(self, embed_latency: float = 0.05, summary_latency: float = 1.0, dim: int = 768):
+        embedder = LocalEmbedder(dim)
+        self.models = _StubModels(embedder, embed_latency)
+        self.aio = type("StubAio", (), {})()
+        self.aio.models = _StubAsyncModels(embedder, embed_latency, summary_latency)
+
+
+def install(
+    latency: float = 1.0,
+    jitter: float = 0.3,
+    tool_latency: float = 0.4,
+    error_rate: float = 0.0,
+    provider_concurrency: int = 0,
+    embed_latency: float = 0.05,
+):
+    """Replaces every provider model and the genai client of this process with stubs."""
+    import app.services.agent as agent_module
+    import app.services.llm_factory as llm_factory
+
+    llm_factory._client_instance = StubGenaiClient(embed_latency=embed_latency, summary_latency=latency)
+
+    def get_model(model_provider: str, prompt_cache_key=None) -> BaseLlm:
+        if model_provider not in agent_module.PROVIDER_API_KEYS:
+            raise ValueError(f"Invalid model provider: {model_provider}")
+        if model_provider not in provider_gates:
+            provider_gates[model_provider] = ProviderGate(provider_concurrency)
+        return StubLlm(
+            model=f"stub-{model_provider}",
+            provider=model_provider,
+            latency=latency,
+            jitter=jitter,
+            tool_latency=tool_latency,
+            error_rate=error_rate,
+        )
+
+    # get_routed_model() builds its providers through get_model too
+    agent_module.get_model = get_model
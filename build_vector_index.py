@@ -0,0 +1,32 @@
+import sys
+import os
+
+# 1. PATH FIX: Ensure the project root is in Python's path
+sys.path.append(os.getcwd())
+
+from app.config import settings
+from app.db.session import SessionLocal
+from app.db.vector_utils import build_vector_index
+from app.services.vector_store import rebuild_all_subject_indexes
+
+def main():
+    index_type = sys.argv[1] if len(sys.argv) > 1 else settings.VECTOR_INDEX_TYPE
+    print(f"--- Building '{index_type}' index on chunks.embedding ---")
+
+    if index_type == "numpy":
+        with SessionLocal() as db:
+            count = rebuild_all_subject_indexes(db)
+        print(f"Success: Exported {count} subject indexes to {settings.NUMPY_INDEX_DIR}.")
+        return
+
+    with SessionLocal() as db:
+        try:
+            build_vector_index(db, index_type)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+
+    print("Success: Vector index is ready.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import shutil
+
+# Prometheus multi-process mode has to be chosen before prometheus_client is imported,
+# in the master, so that every worker writes its samples to the shared directory.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+
+from prometheus_client import multiprocess  # noqa: E402
+
+
+def on_starting(server):
+    # Samples of a previous run would be added to the new workers' ones
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
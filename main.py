@@ -1,6 +1,7 @@
 import os
 import logging
 import flask_admin
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -10,16 +11,31 @@ from a2wsgi import WSGIMiddleware
 from app.api.v1.auth import router as auth_router
 from app.api.v1.school_routes import router as schools_router
 from app.api.v1.documents import router as documents_router
-from app.api.v1.chat import router as chat_router
+from app.api.v1.chat import router as chat_router, agent_registry, session_service
+from app.services.session_store import RedisSessionService
 
 from app.config import settings
 from app.core.logger import setup_logging
+from app.core.tracing import setup_tracing, shutdown_tracing
+from app.core.metrics import MetricsMiddleware, metrics_endpoint
 from app.admin.app import create_admin_app
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title=settings.PROJECT_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_tracing()
+    # Build agents/runners once per worker so the first chat request doesn't pay for it
+    agent_registry.warm_up()
+    if isinstance(session_service, RedisSessionService):
+        session_service.start()
+    yield
+    if isinstance(session_service, RedisSessionService):
+        await session_service.stop()
+    shutdown_tracing()
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +45,10 @@ app.add_middleware(
     allow_headers=["*"], 
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 app.include_router(auth_router, prefix=settings.API_V1_STR, tags=["Auth"])
 app.include_router(schools_router, prefix=settings.API_V1_STR, tags=["Schools"])
 app.include_router(documents_router, prefix=settings.API_V1_STR, tags=["Documents"])
@@ -0,0 +1,13 @@
+import os
+import pytest
+
+# Settings without defaults; the tests below never connect to these
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test")
+os.environ.setdefault("DATABASE_URL_SYNC", "postgresql://test@localhost/test")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from app.services.admission import AdmissionController, AdmissionRejected
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_controller(**overrides) -> AdmissionController:
+    options = dict(
+        namespace="test", redis_url="redis://fake", global_limit=10, tenant_limit=1, queue_size=5,
+        queue_timeout=2.0, lease_seconds=60, retry_after=1, poll_interval=0.01
+    )
+    options.update(overrides)
+    controller = AdmissionController(**options)
+    controller._redis._async = fakeredis.FakeAsyncRedis()
+    return controller
+
+
+async def wait_until_queued(controller: AdmissionController, count: int):
+    _, _, queue_key = controller._keys("tcs")
+    while await controller._redis.aio().zcard(queue_key) < count:
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.anyio
+async def test_waiters_are_admitted_in_arrival_order():
+    controller = make_controller(poll_interval=0.1)
+    first = await controller.acquire("tcs")
+    admitted = []
+
+    async def request(name: str):
+        token = await controller.acquire("tcs")
+        admitted.append(name)
+        await asyncio.sleep(0.05)
+        await controller.release("tcs", token)
+
+    queued = asyncio.create_task(request("queued"))
+    await wait_until_queued(controller, 1)
+
+    # The newcomer asks right after the slot is freed, before the waiter's next poll
+    await controller.release("tcs", first)
+    newcomer = asyncio.create_task(request("newcomer"))
+    await asyncio.gather(queued, newcomer)
+    assert admitted == ["queued", "newcomer"]
+
+
+@pytest.mark.anyio
+async def test_full_queue_and_expired_wait_are_rejected():
+    controller = make_controller(queue_size=1, queue_timeout=0.2)
+    await controller.acquire("tcs")
+
+    waiter = asyncio.create_task(controller.acquire("tcs"))
+    await wait_until_queued(controller, 1)
+    with pytest.raises(AdmissionRejected, match="queue full"):
+        await controller.acquire("tcs")
+    with pytest.raises(AdmissionRejected, match="wait timed out"):
+        await waiter
+
+
+@pytest.mark.anyio
+async def test_release_is_idempotent_and_other_tenants_are_independent():
+    controller = make_controller()
+    token = await controller.acquire("tcs")
+    assert await controller.acquire("other") is not None
+
+    await controller.release("tcs", token)
+    await controller.release("tcs", token)
+    assert await controller.acquire("tcs") is not None
+
+
+@pytest.mark.anyio
+async def test_cancelled_acquire_frees_slot_taken_in_flight():
+    controller = make_controller()
+    controller._client()
+    script = controller._acquire
+    reply_sent = asyncio.Event()
+
+    async def slow_reply(**kwargs):
+        # Redis has run the script, the caller is cancelled before reading the reply
+        result = await script(**kwargs)
+        reply_sent.set()
+        await asyncio.sleep(1)
+        return result
+
+    controller._acquire = slow_reply
+    request = asyncio.create_task(controller.acquire("tcs"))
+    await reply_sent.wait()
+    request.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await request
+
+    global_key, _, _ = controller._keys("tcs")
+    assert await controller._redis.aio().zcard(global_key) == 0
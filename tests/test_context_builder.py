@@ -0,0 +1,19 @@
+from app.services.context_builder import strip_overlap
+
+
+def test_strip_overlap_removes_splitter_overlap():
+    overlap = "Newton's second law relates force, mass and acceleration of a body. "
+    previous = "Forces change motion. " + overlap
+    current = overlap + "F = ma holds in inertial frames."
+    assert strip_overlap(previous, current) == "F = ma holds in inertial frames."
+
+
+def test_strip_overlap_keeps_chunks_without_overlap():
+    assert strip_overlap("We study the", "each planet orbits") == "each planet orbits"
+    assert strip_overlap("value is 12", "2 more") == "2 more"
+
+
+def test_strip_overlap_ignores_short_coincidental_match():
+    previous = "x" * 100 + " the end of the section"
+    current = "the end of the section continues here"
+    assert strip_overlap(previous, current) == current
@@ -0,0 +1,97 @@
+import asyncio
+from typing import AsyncGenerator
+import pytest
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from app.config import settings
+from app.core.tracing import routed_provider
+from app.services import provider_router
+from app.services.provider_router import RoutedLlm
+
+
+class StubLlm(BaseLlm):
+    """Provider that answers with its own name after `delay`, or raises `error`."""
+
+    delay: float = 0.0
+    error: str = ""
+    calls: int = 0
+    cancelled: bool = False
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise RuntimeError(self.error)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.model)]))
+
+
+def make_request() -> LlmRequest:
+    return LlmRequest(
+        model="routed",
+        contents=[types.Content(role="user", parts=[types.Part(text="hi")])],
+        config=types.GenerateContentConfig(),
+    )
+
+
+async def answer(llm: RoutedLlm) -> tuple[list[str], str]:
+    """Response texts and the provider the after_model_callbacks would see."""
+    texts = [response.content.parts[0].text async for response in llm.generate_content_async(make_request())]
+    return texts, routed_provider.get()
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    provider_router._provider_stats.clear()
+    yield
+    provider_router._provider_stats.clear()
+
+
+@pytest.mark.anyio
+async def test_failover_to_next_provider():
+    primary, fallback = StubLlm(model="gemini", error="quota exceeded"), StubLlm(model="groq")
+    llm = RoutedLlm(model="routed", primary="gemini", providers={"gemini": primary, "groq": fallback})
+
+    assert await answer(llm) == (["groq"], "groq")
+    assert provider_router.provider_stats("gemini", False).outcomes[-1] is False
+    assert provider_router.provider_stats("groq", False).outcomes[-1] is True
+
+
+@pytest.mark.anyio
+async def test_hedge_answers_from_faster_provider(monkeypatch):
+    monkeypatch.setattr(settings, "PROVIDER_HEDGE_DEFAULT_DELAY_MS", 20)
+    primary, secondary = StubLlm(model="gemini", delay=5.0), StubLlm(model="groq")
+    llm = RoutedLlm(
+        model="routed", primary="gemini", providers={"gemini": primary, "groq": secondary}, hedge=True
+    )
+
+    assert await asyncio.wait_for(answer(llm), timeout=2.0) == (["groq"], "groq")
+    # The slower call is cancelled, not left running in the background
+    assert primary.cancelled
+
+
+@pytest.mark.anyio
+async def test_no_hedge_waits_for_primary():
+    primary, secondary = StubLlm(model="gemini", delay=0.05), StubLlm(model="groq")
+    llm = RoutedLlm(model="routed", primary="gemini", providers={"gemini": primary, "groq": secondary})
+
+    assert await answer(llm) == (["gemini"], "gemini")
+    assert secondary.calls == 0
+
+
+@pytest.mark.anyio
+async def test_all_providers_fail_raises_last_error():
+    llm = RoutedLlm(model="routed", primary="gemini", providers={
+        "gemini": StubLlm(model="gemini", error="quota exceeded"),
+        "groq": StubLlm(model="groq", error="service unavailable"),
+    })
+
+    with pytest.raises(RuntimeError, match="service unavailable"):
+        await answer(llm)
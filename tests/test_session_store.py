@@ -0,0 +1,95 @@
+from typing import Optional
+import pytest
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from app.services.session_store import RedisSessionService, DIRTY_SET_KEY
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FlakySessionService(InMemorySessionService):
+    """Durable store whose append_event fails for the event with text `fail_on`."""
+
+    def __init__(self):
+        super().__init__()
+        self.fail_on: Optional[str] = None
+
+    async def append_event(self, session, event):
+        if event.content.parts[0].text == self.fail_on:
+            raise ConnectionError("database unavailable")
+        return await super().append_event(session, event)
+
+
+def make_store() -> tuple[RedisSessionService, FlakySessionService]:
+    durable = FlakySessionService()
+    store = RedisSessionService(redis_url="redis://fake", durable=durable, flush_batch=10)
+    store._redis._async = fakeredis.FakeAsyncRedis()
+    return store, durable
+
+
+def user_event(text: str) -> Event:
+    return Event(author="user", invocation_id=text, content=types.Content(role="user", parts=[types.Part(text=text)]))
+
+
+def texts(session) -> list[str]:
+    return [event.content.parts[0].text for event in session.events]
+
+
+async def durable_texts(durable, session) -> list[str]:
+    stored = await durable.get_session(app_name=session.app_name, user_id=session.user_id, session_id=session.id)
+    return texts(stored) if stored else []
+
+
+@pytest.mark.anyio
+async def test_write_behind_flushes_in_order():
+    store, durable = make_store()
+    session = await store.create_session(app_name="qa", user_id="u1", state={"college": "tcs"})
+    for text in ("q1", "a1", "q2"):
+        await store.append_event(session, user_event(text))
+
+    # Served from Redis before anything reached the durable store
+    cached = await store.get_session(app_name="qa", user_id="u1", session_id=session.id)
+    assert texts(cached) == ["q1", "a1", "q2"]
+    assert await durable_texts(durable, session) == []
+
+    assert await store.flush_once() == 4
+    assert await durable_texts(durable, session) == ["q1", "a1", "q2"]
+    stored = await durable.get_session(app_name="qa", user_id="u1", session_id=session.id)
+    assert stored.state["college"] == "tcs"
+
+
+@pytest.mark.anyio
+async def test_partial_failure_keeps_remaining_changes_queued():
+    store, durable = make_store()
+    session = await store.create_session(app_name="qa", user_id="u1")
+    await store.append_event(session, user_event("q1"))
+    assert await store.flush_once() == 2
+
+    for text in ("a1", "q2", "a2"):
+        await store.append_event(session, user_event(text))
+    durable.fail_on = "q2"
+    assert await store.flush_once() == 1
+    # Changes after the failed one stay queued (not skipped) and the session is flushed again
+    client = store._redis.aio()
+    assert await client.llen(store._pending_key("qa", "u1", session.id)) == 2
+    assert await client.scard(DIRTY_SET_KEY) == 1
+    assert await durable_texts(durable, session) == ["q1", "a1"]
+
+    durable.fail_on = None
+    await store.append_event(session, user_event("q3"))
+    await store.stop()
+    assert await durable_texts(durable, session) == ["q1", "a1", "q2", "a2", "q3"]
+    assert await client.llen(store._pending_key("qa", "u1", session.id)) == 0
+
+
+@pytest.mark.anyio
+async def test_delete_does_not_resurrect_pending_session():
+    store, durable = make_store()
+    session = await store.create_session(app_name="qa", user_id="u1")
+    await store.append_event(session, user_event("q1"))
+
+    await store.delete_session(app_name="qa", user_id="u1", session_id=session.id)
+    await store.flush_once()
+
+    assert await store.get_session(app_name="qa", user_id="u1", session_id=session.id) is None
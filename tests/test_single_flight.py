@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from app.services.single_flight import SingleFlight
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_flight(server=None, **overrides) -> SingleFlight:
+    options = dict(namespace="test", redis_url=None, lock_timeout=2.0, result_ttl=30, poll_interval=0.01)
+    options.update(overrides)
+    if server is not None:
+        options["redis_url"] = "redis://fake"
+    flight = SingleFlight(**options)
+    if server is not None:
+        flight._redis._async = fakeredis.FakeAsyncRedis(server=server)
+    return flight
+
+
+def counting(result, delay: float = 0.05):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+
+    return fn, calls
+
+
+@pytest.mark.anyio
+async def test_followers_share_leader_result():
+    flight = make_flight()
+    fn, calls = counting({"answer": 42})
+
+    results = await asyncio.gather(*(flight.do("key", fn) for _ in range(3)))
+
+    assert results == [{"answer": 42}] * 3
+    assert len(calls) == 1
+    assert flight.stats == {"leader": 1, "local_shared": 2, "redis_shared": 0}
+
+
+@pytest.mark.anyio
+async def test_workers_share_result_through_redis():
+    server = fakeredis.FakeServer()
+    first, second = make_flight(server), make_flight(server)
+    fn, calls = counting(["chunk"])
+
+    leader = asyncio.create_task(first.do("key", fn))
+    await asyncio.sleep(0.01)
+    follower = await second.do("key", fn)
+
+    assert await leader == follower == ["chunk"]
+    assert len(calls) == 1
+    assert second.stats["redis_shared"] == 1
+
+
+@pytest.mark.anyio
+async def test_cancelled_leader_does_not_cancel_followers():
+    flight = make_flight()
+    fn, calls = counting("done", delay=0.1)
+
+    leader = asyncio.create_task(flight.do("key", fn))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(flight.do("key", fn))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == "done"
+    assert leader.cancelled()
+    # The follower ran the work itself once the leader went away
+    assert len(calls) == 2
+
+
+@pytest.mark.anyio
+async def test_cancelled_leader_releases_redis_lock():
+    server = fakeredis.FakeServer()
+    first, second = make_flight(server), make_flight(server, lock_timeout=5.0)
+    fn, calls = counting("done", delay=0.1)
+
+    leader = asyncio.create_task(first.do("key", fn))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(second.do("key", fn))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    # Without the lock release the follower would poll for the full lock_timeout
+    assert await asyncio.wait_for(follower, timeout=1.0) == "done"
+    assert len(calls) == 2